@@ -6,6 +6,7 @@ import logging
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Query, BackgroundTasks
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from datetime import datetime
 
 from app.models.models import (
@@ -29,7 +30,7 @@ from app.services.processing_service import ProcessingService
 from app.services.jira_processing_service import JiraProcessingService
 from app.services.diff_service import DiffService
 from app.services.database_service import DatabaseService
-from app.utils.utils import create_error_response, create_success_response
+from app.utils.utils import create_error_response, create_success_response, loads_json
 
 from app.services.jira_poster_service import JiraPosterService
 from app.models.models import (
@@ -438,7 +439,7 @@ async def test_jira_config(
         response = session.get(object_type_url)
         
         if response.status_code == 200:
-            obj_type_data = response.json()
+            obj_type_data = loads_json(response.content)
             return {
                 'status': 'success',
                 'message': 'Configuration valid',
@@ -671,11 +672,11 @@ async def get_all_missing_vms_from_db(
                     if source_value and str(source_value).strip():
                         vmid_value = str(source_value).strip()
                         vmid_found_count += 1
-                        logger.debug(f"Missing VM {vm_data.get('vm_name', 'Unknown')}: VMID = {vmid_value}")
+                        logger.debug("Missing VM %s: VMID = %s", vm_data.get('vm_name', 'Unknown'), vmid_value)
                         break
                 
                 if not vmid_value:
-                    logger.debug(f"Missing VM {vm_data.get('vm_name', 'Unknown')}: No VMID found")
+                    logger.debug("Missing VM %s: No VMID found", vm_data.get('vm_name', 'Unknown'))
                 
                 # ✅ Create MissingVM model with VMID
                 vm_model = MissingVM(
@@ -972,11 +973,15 @@ async def post_vms_to_jira(
             retry_result = poster_service.retry_failed_vms(request.max_retries or 3)
             logger.info(f"Retry result: {retry_result.get('message', 'Completed')}")
         
-        # Process VMs
-        result = poster_service.process_vms(
-            limit=request.limit,
-            delay=jira_config.get('delay_seconds', 1.0)
-        )
+        # Process VMs (resuming after request.cursor when given)
+        try:
+            result = poster_service.process_vms(
+                limit=request.limit,
+                delay=jira_config.get('delay_seconds', 1.0),
+                cursor_token=request.cursor
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         if result['status'] == 'success':
             return JiraPosterResponse(
@@ -986,7 +991,8 @@ async def post_vms_to_jira(
                 successful=result['successful'],
                 failed=result['failed'],
                 processing_time=result.get('processing_time'),
-                results=result.get('results', [])
+                results=result.get('results', []),
+                next_cursor=result.get('next_cursor')
             )
         else:
             raise HTTPException(
@@ -994,6 +1000,8 @@ async def post_vms_to_jira(
                 detail=result.get('message', 'Unknown error occurred')
             )
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Jira Asset posting error: {e}")
         raise HTTPException(
@@ -1022,20 +1030,30 @@ async def post_vms_to_jira_async(
                 'delay_seconds': request.jira_config.delay_seconds or 1.0
             }
         
+        poster_service = JiraPosterService(
+            jira_token=jira_config.get('jira_token'),
+            create_url=jira_config.get('create_url')
+        )
+        
+        # Reject a bad resume token now - the background task could only log it
+        if request.cursor:
+            try:
+                poster_service.decode_pending_cursor(request.cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        
         # Add as background task
         def run_jira_posting():
-            poster_service = JiraPosterService(
-                jira_token=jira_config.get('jira_token'),
-                create_url=jira_config.get('create_url')
-            )
-            
             if request.retry_failed:
                 poster_service.retry_failed_vms(request.max_retries or 3)
             
-            return poster_service.process_vms(
+            result = poster_service.process_vms(
                 limit=request.limit,
-                delay=jira_config.get('delay_seconds', 1.0)
+                delay=jira_config.get('delay_seconds', 1.0),
+                cursor_token=request.cursor
             )
+            logger.info(f"Jira Asset posting (async) finished, next_cursor: {result.get('next_cursor')}")
+            return result
         
         background_tasks.add_task(run_jira_posting)
         
@@ -1047,6 +1065,8 @@ async def post_vms_to_jira_async(
             failed=0
         )
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Jira Asset posting async error: {e}")
         raise HTTPException(
@@ -1159,7 +1179,7 @@ async def get_completed_jira_assets(
                     if field not in asset_data:
                         asset_data[field] = default_value
                 
-                logger.debug(f"Processing asset: {asset_data.get('vm_name')} (original_id: {asset_data.get('original_id')})")
+                logger.debug("Processing asset: %s (original_id: %s)", asset_data.get('vm_name'), asset_data.get('original_id'))
                 
                 # Create CompletedJiraAsset model
                 asset_model = CompletedJiraAsset(**asset_data)
@@ -1389,12 +1409,12 @@ async def get_all_jira_vms_from_db(
                     if field_name in vm_data and vm_data[field_name]:
                         vmid_value = str(vm_data[field_name])
                         vmid_found_count += 1
-                        logger.debug(f"VM {vm_data.get('name', 'Unknown')}: VMID = {vmid_value} (from field: {field_name})")
+                        logger.debug("VM %s: VMID = %s (from field: %s)", vm_data.get('name', 'Unknown'), vmid_value, field_name)
                         break
                 
                 # ✅ NO FALLBACK - If no VMID found, leave it as None
                 if not vmid_value:
-                    logger.debug(f"VM {vm_data.get('name', 'Unknown')}: No VMID found, leaving as None")
+                    logger.debug("VM %s: No VMID found, leaving as None", vm_data.get('name', 'Unknown'))
 
                 # ✅ FIXED - Process data (VMID will be None if not found)
                 processed_data = {
@@ -1642,8 +1662,9 @@ async def post_selected_vms_to_jira(
             object_schema_id=jira_config.get('object_schema_id')
         )
         
-        # Process selected VMs
-        result = poster_service.process_selected_vms(
+        # Process selected VMs - blocking Mongo/HTTP work, keep it off the event loop
+        result = await run_in_threadpool(
+            poster_service.process_selected_vms,
             vm_ids=request.vm_ids,
             delay=request.delay_seconds or 1.0
         )
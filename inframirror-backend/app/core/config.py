@@ -18,6 +18,8 @@ class Settings(BaseSettings):
     mongodb_uri: str = "mongodb://localhost:27017"
     mongodb_database: str = "vmware_inventory"
     mongodb_collection: str = "virtual_machines"
+    mongodb_max_pool_size: int = 100
+    mongodb_compressors: str = "zstd,snappy,zlib"  # PyMongo skips compressors whose module isn't installed
     
     # Default vCenter settings (can be overridden in API calls)
     vcenter_host: str = "kb-bnk-bmdc-vc1.company.com"
@@ -33,10 +35,13 @@ class Settings(BaseSettings):
 
     jira_create_url: str = "https://jira-support.company.com/rest/insight/1.0/object/create"
     jira_poster_delay: float = 1.0  # Delay between requests in seconds
+    jira_poster_max_concurrency: int = 10  # POSTs in flight at once (starts still spaced by the delay)
     jira_max_retries: int = 3
     # Processing settings
     batch_size: int = 50
     max_processes: int = 8
+    # Worker pool start method: forkserver | spawn | fork
+    multiprocessing_start_method: str = "forkserver"
     
     # Redis settings (for Celery)
     redis_url: str = "redis://localhost:6379/0"
@@ -2,9 +2,11 @@
 MongoDB database connection and initialization
 """
 
+import os
+import atexit
 import motor.motor_asyncio
 from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
+from pymongo.errors import ConnectionFailure, OperationFailure
 import logging
 
 from .config import settings
@@ -16,20 +18,29 @@ async_client = motor.motor_asyncio.AsyncIOMotorClient(settings.mongodb_uri)
 async_database = async_client[settings.mongodb_database]
 async_collection = async_database[settings.mongodb_collection]
 
-# Sync MongoDB client (multiprocessing üçün)
+# Sync MongoDB client (multiprocessing üçün) - hər prosesdə bir client
 sync_client = None
 sync_database = None
 sync_collection = None
+sync_client_pid = None
 
 
 def get_sync_client():
     """Sync MongoDB client əldə et"""
-    global sync_client, sync_database, sync_collection
+    global sync_client, sync_database, sync_collection, sync_client_pid
     
-    if not sync_client:
-        sync_client = MongoClient(settings.mongodb_uri)
+    # Fork olunmuş worker parent'in client'ini istifadə etməməlidir
+    if not sync_client or sync_client_pid != os.getpid():
+        sync_client_pid = os.getpid()
+        sync_client = MongoClient(
+            settings.mongodb_uri,
+            maxPoolSize=settings.mongodb_max_pool_size,
+            compressors=settings.mongodb_compressors,
+            appname=settings.app_name
+        )
         sync_database = sync_client[settings.mongodb_database]
         sync_collection = sync_database[settings.mongodb_collection]
+        atexit.register(sync_client.close)
     
     return sync_client, sync_database, sync_collection
 
@@ -48,6 +59,32 @@ def init_database():
         collection.create_index("name")
         collection.create_index("last_updated")
         
+        # IP fields used by the diff pipeline (guest/network IPs are multikey)
+        collection.create_index("ip_address")
+        collection.create_index("guest_ip_addresses")
+        collection.create_index("networks.ip_address")
+        
+        jira_collection = db['jira_virtual_machines']
+        jira_collection.create_index("ip_address")
+        jira_collection.create_index("secondary_ip")
+        jira_collection.create_index("secondary_ip2")
+        # Jira collection upsert key
+        jira_collection.create_index("jira_object_key")
+        
+        # Missing VMs - resolved-VM cleanup filters by IP, upserts by vm_name
+        missing_collection = db['missing_vms_for_jira']
+        missing_collection.create_index("vm_summary.ip")
+        missing_collection.create_index([("vm_name", 1), ("vm_summary.ip", 1)])
+        # One document per VM - new VMs are plain inserts, a duplicate is retried as upsert
+        try:
+            missing_collection.create_index("vm_name", unique=True)
+        except OperationFailure as e:
+            logger.warning(f"missing_vms_for_jira vm_name unique index yaradılmadı (təkrarlanan vm_name var?): {e}")
+        # Poster: pending VMs paged by (created_date, _id)
+        missing_collection.create_index([("status", 1), ("created_date", 1), ("_id", 1)])
+        # Poster: failed VMs eligible for retry
+        missing_collection.create_index([("status", 1), ("retry_count", 1)])
+        
         logger.info("MongoDB index'lər yaradıldı")
         
     except ConnectionFailure as e:
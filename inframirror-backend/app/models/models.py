@@ -368,14 +368,14 @@ class JiraConfig(BaseModel):
 class CollectionRequest(BaseModel):
     """VM collection request model"""
     vcenter_config: Optional[VCenterConfig] = Field(None, description="vCenter connection settings")
-    batch_size: Optional[int] = Field(50, ge=1, le=200, description="VMs per batch")
+    batch_size: Optional[int] = Field(None, ge=1, le=1000, description="VMs per batch (default: sized from the VM count, up to 1000)")
     max_processes: Optional[int] = Field(8, ge=1, le=20, description="Maximum parallel processes")
 
 
 class JiraCollectionRequest(BaseModel):
     """Jira VM collection request model"""
     jira_config: Optional[JiraConfig] = Field(None, description="Jira connection settings")
-    batch_size: Optional[int] = Field(50, ge=1, le=200, description="VMs per batch")
+    batch_size: Optional[int] = Field(None, ge=1, le=1000, description="VMs per batch (default: sized from the VM count, up to 1000)")
     max_processes: Optional[int] = Field(8, ge=1, le=20, description="Maximum parallel processes")
 
 
@@ -476,6 +476,7 @@ class JiraPosterRequest(BaseModel):
     limit: Optional[int] = Field(None, ge=1, le=1000, description="Maximum VMs to process")
     retry_failed: Optional[bool] = Field(False, description="Retry previously failed VMs")
     max_retries: Optional[int] = Field(3, ge=1, le=10, description="Maximum retry attempts")
+    cursor: Optional[str] = Field(None, description="Continue after this page token (next_cursor of an earlier run)")
 
 
 class JiraPosterResponse(BaseModel):
@@ -487,6 +488,7 @@ class JiraPosterResponse(BaseModel):
     failed: int
     processing_time: Optional[float] = None
     results: List[Dict[str, Any]] = Field(default_factory=list)
+    next_cursor: Optional[str] = Field(None, description="Page token to resume after the last fetched VM")
 
 
 class CompletedJiraAsset(BaseModel):
@@ -6,7 +6,7 @@ import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
-from pymongo import UpdateOne
+from pymongo import UpdateOne, WriteConcern
 from pymongo.errors import BulkWriteError
 
 from app.core.database import get_async_collection, get_sync_collection
@@ -15,6 +15,10 @@ from app.models.models import VirtualMachine
 
 logger = logging.getLogger(__name__)
 
+# Collection bulk upserts don't wait for the journal - every run re-collects
+# the same VMs, so a lost batch is rewritten by the next collection
+_BULK_WRITE_CONCERN = WriteConcern(w=1, j=False)
+
 
 class DatabaseService:
     """Database service class - COMPLETE FIXED VERSION"""
@@ -73,20 +77,20 @@ class DatabaseService:
             if not vm_data_list:
                 return {'upserted': 0, 'modified': 0, 'errors': 0}
             
-            operations = []
-            for vm_data in vm_data_list:
-                # Filter query
-                filter_query = {'uuid': vm_data['uuid']} if vm_data.get('uuid') else {'vmid': vm_data['vmid']}
-                
-                operation = UpdateOne(
-                    filter_query,
+            # Filter query by uuid (vmid when there is none)
+            operations = [
+                UpdateOne(
+                    {'uuid': vm_data['uuid']} if vm_data.get('uuid') else {'vmid': vm_data['vmid']},
                     {'$set': vm_data},
                     upsert=True
                 )
-                operations.append(operation)
+                for vm_data in vm_data_list
+            ]
             
-            # Bulk write
-            result = self.sync_collection.bulk_write(operations, ordered=False)
+            # Bulk write - one unordered round trip per batch, docs are built by us so skip validation
+            result = self.sync_collection.with_options(write_concern=_BULK_WRITE_CONCERN).bulk_write(
+                operations, ordered=False, bypass_document_validation=True
+            )
             
             return {
                 'upserted': result.upserted_count,
@@ -105,6 +109,34 @@ class DatabaseService:
             logger.error(f"VM bulk upsert error: {e}")
             return {'upserted': 0, 'modified': 0, 'errors': len(vm_data_list)}
     
+    def get_jira_vm_fingerprints(self, object_keys: List[str]) -> Dict[str, str]:
+        """Stored jira_fingerprint by Jira object key (keys without one are left out)"""
+        try:
+            jira_collection = self.sync_collection.database['jira_virtual_machines']
+            cursor = jira_collection.find(
+                {'jira_object_key': {'$in': object_keys}, 'jira_fingerprint': {'$exists': True}},
+                {'_id': 0, 'jira_object_key': 1, 'jira_fingerprint': 1}
+            )
+            return {doc['jira_object_key']: doc['jira_fingerprint'] for doc in cursor}
+        except Exception as e:
+            logger.error(f"Jira VM fingerprint lookup error: {e}")
+            return {}
+    
+    def touch_jira_vms(self, object_keys: List[str], now: datetime) -> int:
+        """Refresh last_updated of unchanged Jira VMs in one update"""
+        try:
+            if not object_keys:
+                return 0
+            jira_collection = self.sync_collection.database['jira_virtual_machines']
+            result = jira_collection.update_many(
+                {'jira_object_key': {'$in': object_keys}},
+                {'$set': {'last_updated': now}}
+            )
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"Jira VM touch error: {e}")
+            return 0
+    
     def bulk_upsert_jira_vms(self, vm_data_list: List[Dict[str, Any]]) -> Dict[str, int]:
         """Bulk upsert Jira VMs to separate collection"""
         try:
@@ -114,22 +146,22 @@ class DatabaseService:
             # Get Jira VMs collection
             client = self.sync_collection.database.client
             db = client[settings.mongodb_database]
-            jira_collection = db['jira_virtual_machines']
+            jira_collection = db.get_collection('jira_virtual_machines', write_concern=_BULK_WRITE_CONCERN)
             
-            operations = []
-            for vm_data in vm_data_list:
-                # Filter query by Jira object key
-                filter_query = {'jira_object_key': vm_data['jira_object_key']}
-                
-                operation = UpdateOne(
-                    filter_query,
+            # Filter query by Jira object key
+            operations = [
+                UpdateOne(
+                    {'jira_object_key': vm_data['jira_object_key']},
                     {'$set': vm_data},
                     upsert=True
                 )
-                operations.append(operation)
+                for vm_data in vm_data_list
+            ]
             
-            # Bulk write
-            result = jira_collection.bulk_write(operations, ordered=False)
+            # Bulk write - unordered, docs are built by us so skip validation
+            result = jira_collection.bulk_write(
+                operations, ordered=False, bypass_document_validation=True
+            )
             
             return {
                 'upserted': result.upserted_count,
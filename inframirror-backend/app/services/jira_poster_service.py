@@ -6,23 +6,112 @@ Integrated into VMware Collector FastAPI structure
 
 import json
 import time
+import base64
 import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from datetime import datetime
-from typing import Dict, List, Any, Optional
-import asyncio
+from typing import Dict, Iterable, List, Any, Optional, Tuple
 import requests
 import urllib3
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from pymongo import MongoClient, UpdateOne, WriteConcern
+from pymongo.errors import ConnectionFailure, BulkWriteError
+from bson import ObjectId
+from bson.errors import InvalidId
 
 from app.core.config import settings
-from app.core.database import get_sync_collection
+from app.core.database import get_sync_client
+from app.utils.utils import dumps_json, loads_json
 
 # Disable SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 logger = logging.getLogger(__name__)
 
+# Posted VMs are archived / failed POSTs marked in bulk writes of this size
+# (a successful POST is marked completed right away, see mark_as_posted)
+_RESULT_FLUSH_SIZE = 50
+
+# Pending VMs are read and posted this many at a time (keyset pages, see get_pending_vms_page)
+_PENDING_PAGE_SIZE = 100
+
+# Fields needed to POST a pending VM - the full document is archived
+# into completed_jira_assets server-side ($merge), never loaded
+_PENDING_PROJECTION = {
+    'vm_name': 1,
+    'jira_asset_payload': 1,
+    'retry_count': 1,
+    'status': 1,
+    'created_date': 1
+}
+
+
+@lru_cache(maxsize=1)
+def _jira_collections(pid: int):
+    """(missing_vms_for_jira, completed_jira_assets, missing status handle) - resolved once per process
+    
+    Failure/retry status flips go through the w=1, unjournaled handle: losing one
+    on a crash only means a VM is retried again. Completed marks, inserts into
+    completed and the deletes that follow them keep the default write concern
+    (a lost completed mark would post the VM to Jira twice).
+    """
+    _, db, _ = get_sync_client()
+    missing_collection = db['missing_vms_for_jira']
+    missing_status_collection = missing_collection.with_options(
+        write_concern=WriteConcern(w=1, j=False)
+    )
+    return missing_collection, db['completed_jira_assets'], missing_status_collection
+
+
+# Keep-alive connections per host - enough for every concurrent poster worker
+_SESSION_POOL_SIZE = max(32, settings.jira_poster_max_concurrency)
+
+_sessions: Dict[Tuple[int, str], requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def _jira_session(jira_token: str) -> requests.Session:
+    """Pooled Jira session - one per (process, token), shared by poster instances"""
+    key = (os.getpid(), jira_token)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            session.verify = False
+            
+            # Set authentication headers
+            session.headers.update({
+                'Authorization': f"Bearer {jira_token}",
+                'Content-Type': 'application/json',
+                'Accept': 'application/json'
+            })
+            
+            # Retry throttling/unavailable responses only - a POST that timed out
+            # or hit a gateway error may already have created the object
+            retry = Retry(
+                total=3,
+                read=0,
+                backoff_factor=0.5,
+                status_forcelist=[429, 503],
+                allowed_methods=['POST'],
+                raise_on_status=False
+            )
+            adapter = HTTPAdapter(
+                pool_connections=_SESSION_POOL_SIZE,
+                pool_maxsize=_SESSION_POOL_SIZE,
+                max_retries=retry
+            )
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            
+            _sessions[key] = session
+            logger.info("Jira API session created successfully")
+    return session
+
 
 class JiraPosterService:
     """Service for posting VM payloads to Jira Asset Management"""
@@ -43,18 +132,21 @@ class JiraPosterService:
         # Get MongoDB collections
         self.missing_collection = None
         self.completed_collection = None
+        self.missing_status_collection = None
+        
+        # Posted VMs waiting for their completed/failed bulk write
+        self._pending_completes = []
+        self._pending_failures = []
+        self._results_lock = threading.Lock()
 
         logger.info(f"JiraPosterService initialized with ObjectType: {self.object_type_id}, Schema: {self.object_schema_id}")
         
     def get_collections(self):
         """Get MongoDB collections for missing and completed VMs"""
         if self.missing_collection is None:
-            # Get missing VMs collection
-            vcenter_collection = get_sync_collection()
-            client = vcenter_collection.database.client
-            db = client[settings.mongodb_database]
-            self.missing_collection = db['missing_vms_for_jira']
-            self.completed_collection = db['completed_jira_assets']
+            # Shared by all poster instances of this process
+            (self.missing_collection, self.completed_collection,
+             self.missing_status_collection) = _jira_collections(os.getpid())
     
     def get_session(self) -> Optional[requests.Session]:
         """Get authenticated Jira API session
@@ -65,56 +157,81 @@ class JiraPosterService:
         try:
             if self.session:
                 return self.session
-                
-            session = requests.Session()
-            session.verify = False
-            
-            # Set authentication headers
-            session.headers.update({
-                'Authorization': f"Bearer {self.jira_token}",
-                'Content-Type': 'application/json',
-                'Accept': 'application/json'
-            })
             
-            self.session = session
-            logger.info("Jira API session created successfully")
-            return session
+            self.session = _jira_session(self.jira_token)
+            return self.session
             
         except Exception as e:
             logger.error(f"Jira API session error: {e}")
             return None
     
-    def get_pending_vms(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
-        """Get VMs with pending_creation status from database
+    def get_pending_vms_page(self, cursor_token: Optional[str] = None,
+                             page_size: int = _PENDING_PAGE_SIZE) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get one page of pending VMs using keyset pagination
+        
+        Pages are ordered by (created_date, _id) and continue after the last
+        VM of the previous page, so no skip() is needed and a stopped run can
+        resume from its last token.
         
         Args:
-            limit: Maximum number of VMs to retrieve
+            cursor_token: Token returned with the previous page (None for the first page)
+            page_size: Maximum number of VMs in the page
             
         Returns:
-            List of pending VM documents
+            (pending VM documents, token of the last VM in the page -
+            cursor_token again when the page is empty)
+            
+        Raises:
+            ValueError: cursor_token is not a valid page token
+        """
+        query = {'status': 'pending_creation'}
+        if cursor_token:
+            last_date, last_id = self.decode_pending_cursor(cursor_token)
+            if last_date is None:
+                # null/missing created_date sorts before every date
+                query['$or'] = [
+                    {'created_date': {'$ne': None}},
+                    {'created_date': None, '_id': {'$gt': last_id}}
+                ]
+            else:
+                query['$or'] = [
+                    {'created_date': {'$gt': last_date}},
+                    {'created_date': last_date, '_id': {'$gt': last_id}}
+                ]
+        
+        self.get_collections()
+        cursor = self.missing_collection.find(query, _PENDING_PROJECTION).sort(
+            [('created_date', 1), ('_id', 1)]
+        ).limit(page_size).batch_size(page_size)
+        
+        docs = list(cursor)
+        logger.info(f"Retrieved {len(docs)} pending VMs (page)")
+        return docs, (self.encode_pending_cursor(docs[-1]) if docs else cursor_token)
+    
+    def encode_pending_cursor(self, vm_doc: Dict[str, Any]) -> str:
+        """Encode the (created_date, _id) position of a VM as a page token"""
+        created_date = vm_doc.get('created_date')
+        position = {
+            'created_date': created_date.isoformat() if isinstance(created_date, datetime) else None,
+            '_id': str(vm_doc['_id'])
+        }
+        return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+    
+    def decode_pending_cursor(self, cursor_token: str) -> Tuple[Optional[datetime], ObjectId]:
+        """Decode a page token back into (created_date, _id)
+        
+        Raises:
+            ValueError: the token was not produced by encode_pending_cursor
         """
         try:
-            self.get_collections()
-            
-            # Find pending VMs
-            query = {'status': 'pending_creation'}
-            cursor = self.missing_collection.find(query).sort('created_date', 1)
-            
-            pending_vms = []
-            count = 0
-            
-            for doc in cursor:
-                if limit and count >= limit:
-                    break
-                pending_vms.append(doc)
-                count += 1
-            
-            logger.info(f"Retrieved {len(pending_vms)} pending VMs")
-            return pending_vms
-            
-        except Exception as e:
-            logger.error(f"Error retrieving pending VMs: {e}")
-            return []
+            position = json.loads(base64.b64decode(cursor_token, altchars=b'-_', validate=True))
+            created_date = position['created_date']
+            return (
+                datetime.fromisoformat(created_date) if created_date is not None else None,
+                ObjectId(position['_id'])
+            )
+        except (ValueError, TypeError, KeyError, InvalidId) as e:
+            raise ValueError(f"Invalid pending VM cursor: {cursor_token!r}") from e
     
     def post_vm_to_jira(self, vm_doc: Dict[str, Any]) -> Dict[str, Any]:
         """Post single VM to Jira Asset Management
@@ -137,14 +254,19 @@ class JiraPosterService:
                 return {'success': False, 'error': 'Jira payload is empty'}
             
             logger.info(f"🚀 Posting VM '{vm_name}' to Jira...")
-            logger.debug(f"Payload: {json.dumps(jira_payload, indent=2)}")
-            
-            # POST to Jira Asset API
-            response = session.post(self.create_url, json=jira_payload, timeout=30)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Payload: %s", json.dumps(jira_payload))
+            
+            # POST to Jira Asset API (JSON Content-Type comes from the session headers)
+            response = session.post(
+                self.create_url,
+                data=dumps_json(jira_payload),
+                timeout=30
+            )
             
             if response.status_code == 201:
                 # Successfully created
-                response_data = response.json()
+                response_data = loads_json(response.content)
                 created_object_key = response_data.get('objectKey', 'Unknown')
                 
                 logger.info(f"✅ VM '{vm_name}' created successfully: {created_object_key}")
@@ -198,181 +320,374 @@ class JiraPosterService:
             logger.error(f"VM '{vm_name}' POST exception: {e}")
             return {'success': False, 'error': f'Exception: {str(e)}', 'vm_name': vm_name}
     
-    def move_to_completed(self, vm_doc: Dict[str, Any], post_result: Dict[str, Any]) -> bool:
-        """Move successfully posted VM to completed collection
+    def build_failed_update(self, vm_doc: Dict[str, Any], post_result: Dict[str, Any],
+                            now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Build the $set fields that mark a VM as failed"""
+        now = now or datetime.utcnow()
+        return {
+            'status': 'failed',
+            'failure_date': now,
+            'failure_reason': post_result.get('error', 'Unknown error'),
+            'failure_status_code': post_result.get('status_code'),
+            'retry_count': vm_doc.get('retry_count', 0) + 1,
+            'last_attempt': now
+        }
+    
+    def build_posted_update(self, post_result: Dict[str, Any], now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Build the $set fields that mark a VM created in Jira as completed"""
+        return {
+            'status': 'completed',
+            'jira_post_date': now or datetime.utcnow(),
+            'jira_object_key': post_result.get('object_key'),
+            'jira_response': post_result.get('response_data')
+        }
+    
+    def mark_as_posted(self, vm_doc: Dict[str, Any], post_result: Dict[str, Any]) -> bool:
+        """Mark a VM created in Jira as completed in missing_vms_for_jira
+        
+        Written right after the POST - only the move to completed_jira_assets is
+        batched, so a VM never stays pending_creation and gets posted twice.
         
-        Args:
-            vm_doc: Original VM document
-            post_result: Result from successful POST operation
-            
         Returns:
             True if successful, False otherwise
         """
         try:
             self.get_collections()
-            
-            # Create completed document
-            completed_doc = vm_doc.copy()
-            completed_doc.update({
-                'status': 'completed',
-                'jira_post_date': datetime.utcnow(),
-                'jira_object_key': post_result.get('object_key'),
-                'jira_response': post_result.get('response_data'),
-                'original_id': vm_doc.get('_id'),
-                'processing_completed': True
-            })
-            
-            # Remove MongoDB _id field to avoid conflicts
-            if '_id' in completed_doc:
-                del completed_doc['_id']
-            
-            # Insert to completed collection
-            self.completed_collection.insert_one(completed_doc)
-            
-            # Delete original document
-            self.missing_collection.delete_one({'_id': vm_doc['_id']})
-            
-            vm_name = vm_doc.get('vm_name', 'Unknown')
-            logger.info(f"📦 VM '{vm_name}' moved to completed collection")
+            self.missing_collection.update_one(
+                {'_id': vm_doc['_id']},
+                {'$set': self.build_posted_update(post_result)}
+            )
             return True
-            
         except Exception as e:
-            logger.error(f"Error moving VM to completed: {e}")
+            logger.error(f"Error marking VM '{vm_doc.get('vm_name', 'Unknown')}' as posted: {e}")
             return False
     
-    def mark_as_failed(self, vm_doc: Dict[str, Any], post_result: Dict[str, Any]) -> bool:
-        """Mark failed POST VM with failed status
+    def record_result(self, vm_doc: Dict[str, Any], post_result: Dict[str, Any]):
+        """Record the result of a posted VM
         
-        Args:
-            vm_doc: Original VM document
-            post_result: Result from failed POST operation
+        A success is marked completed right away; the archive move and the
+        failure marks are buffered and written in bulk every _RESULT_FLUSH_SIZE
+        VMs, outside _results_lock.
+        """
+        if post_result['success']:
+            marked = self.mark_as_posted(vm_doc, post_result)
+        
+        with self._results_lock:
+            if post_result['success']:
+                self._pending_completes.append((vm_doc, post_result, marked))
+            else:
+                self._pending_failures.append((vm_doc, post_result))
             
-        Returns:
-            True if successful, False otherwise
+            if len(self._pending_completes) + len(self._pending_failures) < _RESULT_FLUSH_SIZE:
+                return
+            completes, failures = self._take_results_locked()
+        
+        self._write_results(completes, failures)
+    
+    def flush_results(self):
+        """Write all buffered completed/failed VMs to MongoDB"""
+        with self._results_lock:
+            completes, failures = self._take_results_locked()
+        self._write_results(completes, failures)
+    
+    def _take_results_locked(self):
+        """Swap out the result buffers - caller holds _results_lock"""
+        completes, self._pending_completes = self._pending_completes, []
+        failures, self._pending_failures = self._pending_failures, []
+        return completes, failures
+    
+    def _write_results(self, completes: List[Tuple[Dict[str, Any], Dict[str, Any], bool]],
+                       failures: List[Tuple[Dict[str, Any], Dict[str, Any]]]):
+        """Bulk write taken results - runs without _results_lock
+        
+        Completes and failures are written independently, so an error in one
+        never drops the other.
         """
+        if not completes and not failures:
+            return
+        
+        # One timestamp for the whole flush
+        now = datetime.utcnow()
+        
         try:
             self.get_collections()
+        except Exception as e:
+            logger.error(f"Error writing poster results: {e}")
+            return
+        
+        if completes:
+            self._archive_completes(completes, now)
+        
+        if failures:
+            try:
+                self.missing_status_collection.bulk_write(
+                    [UpdateOne({'_id': vm_doc['_id']}, {'$set': self.build_failed_update(vm_doc, post_result, now)})
+                     for vm_doc, post_result in failures],
+                    ordered=False
+                )
+                logger.warning(f"⚠️ {len(failures)} VMs marked as failed")
+            except BulkWriteError as e:
+                self._log_bulk_write_error("Error marking VMs as failed", e)
+            except Exception as e:
+                logger.error(f"Error marking VMs as failed: {e}")
+    
+    def _archive_completes(self, completes: List[Tuple[Dict[str, Any], Dict[str, Any], bool]], now: datetime):
+        """Move VMs created in Jira from missing_vms_for_jira to completed_jira_assets
+        
+        The move is a $merge of the completed-marked documents. If it fails they are
+        not deleted but flagged archive_failed (already marked completed, so they
+        are never posted again).
+        """
+        # Completed marks that failed right after the POST are retried first
+        unmarked = [(vm_doc, post_result) for vm_doc, post_result, marked in completes if not marked]
+        if unmarked:
+            try:
+                self.missing_collection.bulk_write(
+                    [UpdateOne({'_id': vm_doc['_id']}, {'$set': self.build_posted_update(post_result, now)})
+                     for vm_doc, post_result in unmarked],
+                    ordered=False
+                )
+                unmarked = []
+            except Exception as e:
+                logger.error(f"Error marking posted VMs as completed: {e}")
+        
+        # Archived server-side from the completed-marked documents - pending VMs are
+        # loaded with a projection, the full documents never leave MongoDB
+        archive_filter = {'_id': {'$in': [vm_doc['_id'] for vm_doc, _, _ in completes]}, 'status': 'completed'}
+        try:
+            self.missing_collection.aggregate([
+                {'$match': archive_filter},
+                {'$set': {'original_id': '$_id', 'processing_completed': True}},
+                {'$unset': '_id'},
+                {'$merge': {'into': self.completed_collection.name, 'whenNotMatched': 'insert'}}
+            ])
+            archived = True
+        except Exception as e:
+            logger.error(f"Error archiving completed VMs: {e}")
+            archived = False
+        
+        try:
+            if archived:
+                self.missing_collection.delete_many(archive_filter)
+                logger.info(f"📦 {len(completes) - len(unmarked)} VMs moved to completed collection")
+            else:
+                self.missing_collection.update_many(archive_filter, {'$set': {'archive_failed': True}})
+                logger.warning(f"⚠️ {len(completes) - len(unmarked)} VMs created in Jira but not archived - kept as completed")
+        except Exception as e:
+            logger.error(f"Error updating posted VMs in missing collection: {e}")
+        
+        # Created in Jira but never marked completed - list them so they can be cleaned up by hand
+        for vm_doc, post_result in unmarked:
+            logger.error(f"  Still pending but created in Jira: {vm_doc.get('vm_name', 'Unknown')} -> {post_result.get('object_key')}")
+    
+    def _log_bulk_write_error(self, message: str, error: BulkWriteError):
+        """Log a BulkWriteError with its first write errors"""
+        logger.error(f"{message}: {error}")
+        for write_error in error.details.get('writeErrors', [])[:10]:
+            logger.error(f"  Write error at op {write_error.get('index')}: {write_error.get('errmsg')}")
+    
+    def post_and_record(self, vm_doc: Dict[str, Any]) -> Dict[str, Any]:
+        """POST a VM to Jira and buffer its move to completed / failed mark
+        
+        Args:
+            vm_doc: VM document from MongoDB
             
-            # Update status to failed
-            update_doc = {
-                'status': 'failed',
-                'failure_date': datetime.utcnow(),
-                'failure_reason': post_result.get('error', 'Unknown error'),
-                'failure_status_code': post_result.get('status_code'),
-                'retry_count': vm_doc.get('retry_count', 0) + 1,
-                'last_attempt': datetime.utcnow()
+        Returns:
+            Result entry for the API response (see build_result_entry)
+        """
+        post_result = self.post_vm_to_jira(vm_doc)
+        self.record_result(vm_doc, post_result)
+        # Only the slim entry outlives the flush - the Jira response is not kept for the whole run
+        return self.build_result_entry(vm_doc, post_result)
+    
+    def build_result_entry(self, vm_doc: Dict[str, Any], post_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the per-VM entry returned in the 'results' list"""
+        vm_name = vm_doc.get('vm_name', 'Unknown')
+        
+        if post_result['success']:
+            return {
+                'vm_name': vm_name,
+                'status': 'success',
+                'object_key': post_result.get('object_key'),
+                'message': f"Created as {post_result.get('object_key')}"
             }
+        
+        return {
+            'vm_name': vm_name,
+            'status': 'failed',
+            'error': post_result.get('error'),
+            'status_code': post_result.get('status_code'),
+            'message': f"Failed: {post_result.get('error')}"
+        }
+    
+    def post_vms_concurrently(self, vm_docs: List[Dict[str, Any]], delay: float,
+                              max_concurrency: int, log_label: str = "Processing") -> List[Dict[str, Any]]:
+        """POST VMs with up to max_concurrency requests in flight
+        
+        Request starts are still spaced by delay seconds, so the request rate
+        towards Jira stays the same as the old one-by-one loop.
+        
+        Args:
+            vm_docs: VM documents to post
+            delay: Minimum seconds between two request starts
+            max_concurrency: Maximum number of requests in flight
+            log_label: Prefix for the per-VM progress log
             
-            self.missing_collection.update_one(
-                {'_id': vm_doc['_id']},
-                {'$set': update_doc}
-            )
-            
-            vm_name = vm_doc.get('vm_name', 'Unknown')
-            logger.warning(f"⚠️ VM '{vm_name}' marked as failed")
-            return True
+        Returns:
+            Result entries (build_result_entry), in vm_docs order
+        """
+        total = len(vm_docs)
+        rate_lock = threading.Lock()
+        next_start = [time.monotonic()]
+        
+        def post(indexed_doc):
+            i, vm_doc = indexed_doc
+            if delay > 0:
+                # Reserve the next start slot, then wait for it outside the lock
+                with rate_lock:
+                    now = time.monotonic()
+                    start_at = max(next_start[0], now)
+                    next_start[0] = start_at + delay
+                if start_at > now:
+                    time.sleep(start_at - now)
+            
+            logger.info(f"📤 [{i}/{total}] {log_label}: {vm_doc.get('vm_name', 'Unknown')}")
+            return self.post_and_record(vm_doc)
+        
+        # Shared by all workers - create once instead of racing in the threads
+        self.get_session()
+        self.get_collections()
+        
+        workers = max(1, min(max_concurrency, total))
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(post, enumerate(vm_docs, 1)))
+        finally:
+            self.flush_results()
+    
+    def _process_vm_list(self, vm_docs: List[Dict[str, Any]], delay: float = 1.0,
+                         max_concurrency: Optional[int] = None,
+                         log_label: str = "Processing") -> Dict[str, Any]:
+        """POST already loaded VM documents to Jira and build the statistics
+        
+        Args:
+            vm_docs: VM documents from missing_vms_for_jira
+            delay: Delay between requests in seconds
+            max_concurrency: POSTs in flight at once (default: settings.jira_poster_max_concurrency)
+            log_label: Progress log prefix
             
-        except Exception as e:
-            logger.error(f"Error marking VM as failed: {e}")
-            return False
+        Returns:
+            Dictionary with processing statistics
+        """
+        return self._process_vm_pages([vm_docs], delay, max_concurrency, log_label)
     
-    def process_vms(self, limit: Optional[int] = None, delay: float = 1.0) -> Dict[str, Any]:
+    def _process_vm_pages(self, vm_pages: Iterable[List[Dict[str, Any]]], delay: float = 1.0,
+                          max_concurrency: Optional[int] = None,
+                          log_label: str = "Processing") -> Dict[str, Any]:
+        """POST VM documents page by page and build the statistics of all pages"""
+        # Statistics
+        stats = {
+            'status': 'success',
+            'processed': 0,
+            'successful': 0,
+            'failed': 0,
+            'results': [],
+            'start_time': datetime.utcnow(),
+            'processing_time': 0
+        }
+        
+        start_time = time.time()
+        
+        # POST to Jira (concurrently, rate limited by delay) - a page is done before the next is read
+        for vm_docs in vm_pages:
+            stats['results'].extend(self.post_vms_concurrently(
+                vm_docs, delay, max_concurrency or settings.jira_poster_max_concurrency,
+                log_label=log_label
+            ))
+        
+        stats['processed'] = len(stats['results'])
+        stats['successful'] = sum(1 for entry in stats['results'] if entry['status'] == 'success')
+        stats['failed'] = stats['processed'] - stats['successful']
+        
+        # Calculate final statistics
+        end_time = time.time()
+        stats['processing_time'] = end_time - start_time
+        stats['end_time'] = datetime.utcnow()
+        
+        # Log final results
+        logger.info("=" * 50)
+        logger.info("JIRA ASSET POSTER RESULTS:")
+        logger.info(f"Processed VMs: {stats['processed']}")
+        logger.info(f"Successful POSTs: {stats['successful']}")
+        logger.info(f"Failed POSTs: {stats['failed']}")
+        logger.info(f"Processing time: {stats['processing_time']:.2f} seconds")
+        logger.info("=" * 50)
+        
+        if stats['successful'] > 0:
+            logger.info(f"🎉 {stats['successful']} VMs successfully added to Jira Asset!")
+            logger.info("📦 Completed VMs stored in 'completed_jira_assets' collection")
+        
+        return stats
+    
+    def process_vms(self, limit: Optional[int] = None, delay: float = 1.0,
+                    max_concurrency: Optional[int] = None,
+                    cursor_token: Optional[str] = None) -> Dict[str, Any]:
         """Process VMs and POST them to Jira Asset Management
         
+        Pending VMs are read in (created_date, _id) pages of _PENDING_PAGE_SIZE;
+        each page is posted before the next one is read.
+        
         Args:
             limit: Maximum number of VMs to process
             delay: Delay between requests in seconds
+            max_concurrency: POSTs in flight at once (default: settings.jira_poster_max_concurrency)
+            cursor_token: next_cursor of an earlier run - continue after its last VM
             
         Returns:
-            Dictionary with processing statistics
+            Dictionary with processing statistics; next_cursor resumes after the last fetched VM
+            
+        Raises:
+            ValueError: cursor_token is not a valid page token
         """
+        # A bad token is the caller's error - raised, not reported as an empty run
+        if cursor_token:
+            self.decode_pending_cursor(cursor_token)
+        
+        def page_size(fetched):
+            return min(_PENDING_PAGE_SIZE, limit - fetched) if limit else _PENDING_PAGE_SIZE
+        
         try:
-            # Get pending VMs
-            pending_vms = self.get_pending_vms(limit)
+            # Get the first page of pending VMs
+            first_page, next_cursor = self.get_pending_vms_page(cursor_token, page_size(0))
             
-            if not pending_vms:
+            if not first_page:
                 logger.info("No pending VMs found for posting")
                 return {
                     'status': 'success',
                     'processed': 0,
                     'successful': 0,
                     'failed': 0,
-                    'results': []
+                    'results': [],
+                    'next_cursor': cursor_token
                 }
             
-            logger.info(f"📋 Processing {len(pending_vms)} VMs for Jira posting")
+            logger.info(f"📋 Processing pending VMs for Jira posting (limit: {limit or 'none'})")
             
-            # Statistics
-            stats = {
-                'status': 'success',
-                'processed': 0,
-                'successful': 0,
-                'failed': 0,
-                'results': [],
-                'start_time': datetime.utcnow(),
-                'processing_time': 0
-            }
+            # Token after the last fetched page, updated as pages are read
+            position = [next_cursor]
             
-            start_time = time.time()
-            
-            # Process each VM
-            for i, vm_doc in enumerate(pending_vms, 1):
-                vm_name = vm_doc.get('vm_name', 'Unknown')
-                
-                logger.info(f"📤 [{i}/{len(pending_vms)}] Processing: {vm_name}")
-                
-                # POST to Jira
-                post_result = self.post_vm_to_jira(vm_doc)
-                
-                stats['processed'] += 1
-                
-                if post_result['success']:
-                    # Successful POST
-                    stats['successful'] += 1
-                    self.move_to_completed(vm_doc, post_result)
-                    
-                    stats['results'].append({
-                        'vm_name': vm_name,
-                        'status': 'success',
-                        'object_key': post_result.get('object_key'),
-                        'message': f"Created as {post_result.get('object_key')}"
-                    })
-                    
-                else:
-                    # Failed POST
-                    stats['failed'] += 1
-                    self.mark_as_failed(vm_doc, post_result)
-                    
-                    stats['results'].append({
-                        'vm_name': vm_name,
-                        'status': 'failed',
-                        'error': post_result.get('error'),
-                        'status_code': post_result.get('status_code'),
-                        'message': f"Failed: {post_result.get('error')}"
-                    })
-                
-                # Apply rate limiting delay
-                if i < len(pending_vms) and delay > 0:
-                    time.sleep(delay)
-            
-            # Calculate final statistics
-            end_time = time.time()
-            stats['processing_time'] = end_time - start_time
-            stats['end_time'] = datetime.utcnow()
-            
-            # Log final results
-            logger.info("=" * 50)
-            logger.info("JIRA ASSET POSTER RESULTS:")
-            logger.info(f"Processed VMs: {stats['processed']}")
-            logger.info(f"Successful POSTs: {stats['successful']}")
-            logger.info(f"Failed POSTs: {stats['failed']}")
-            logger.info(f"Processing time: {stats['processing_time']:.2f} seconds")
-            logger.info("=" * 50)
-            
-            if stats['successful'] > 0:
-                logger.info(f"🎉 {stats['successful']} VMs successfully added to Jira Asset!")
-                logger.info("📦 Completed VMs stored in 'completed_jira_assets' collection")
+            def pages():
+                page, size, fetched = first_page, page_size(0), 0
+                while page:
+                    yield page
+                    fetched += len(page)
+                    if len(page) < size or (limit and fetched >= limit):
+                        return
+                    size = page_size(fetched)
+                    page, position[0] = self.get_pending_vms_page(position[0], size)
             
+            stats = self._process_vm_pages(pages(), delay, max_concurrency)
+            stats['next_cursor'] = position[0]
             return stats
             
         except Exception as e:
@@ -398,13 +713,14 @@ class JiraPosterService:
             # Count VMs by status
             pending_count = self.missing_collection.count_documents({'status': 'pending_creation'})
             failed_count = self.missing_collection.count_documents({'status': 'failed'})
-            completed_count = self.completed_collection.count_documents({})
+            # Unfiltered count - collection metadata is enough, no scan needed
+            completed_count = self.completed_collection.estimated_document_count()
             
-            # Get retry counts for failed VMs
+            # Get retry counts for failed VMs (capped - failed_vms has the full count)
             failed_vms = list(self.missing_collection.find(
                 {'status': 'failed'}, 
                 {'vm_name': 1, 'retry_count': 1, 'failure_reason': 1}
-            ))
+            ).limit(1000).batch_size(200))
             
             return {
                 'pending_vms': pending_count,
@@ -442,7 +758,7 @@ class JiraPosterService:
                 'retry_count': {'$lt': max_retries}
             }
             
-            failed_vms = list(self.missing_collection.find(retry_query))
+            failed_vms = list(self.missing_collection.find(retry_query).batch_size(500))
             
             if not failed_vms:
                 logger.info("No failed VMs available for retry")
@@ -458,13 +774,15 @@ class JiraPosterService:
             
             # Reset status to pending for retry
             vm_ids = [vm['_id'] for vm in failed_vms]
-            self.missing_collection.update_many(
+            self.missing_status_collection.update_many(
                 {'_id': {'$in': vm_ids}},
                 {'$set': {'status': 'pending_creation'}}
             )
+            for vm in failed_vms:
+                vm['status'] = 'pending_creation'
             
-            # Process the retried VMs
-            return self.process_vms(limit=len(failed_vms))
+            # Process exactly the retried VMs (already loaded - no pending re-query)
+            return self._process_vm_list(failed_vms, log_label="Retrying")
             
         except Exception as e:
             logger.error(f"Error retrying failed VMs: {e}")
@@ -475,13 +793,10 @@ class JiraPosterService:
             }
 
 
-    def process_selected_vms(self, vm_ids: List[str], delay: float = 1.0) -> Dict[str, Any]:
+    def process_selected_vms(self, vm_ids: List[str], delay: float = 1.0,
+                             max_concurrency: Optional[int] = None) -> Dict[str, Any]:
         """Process specific selected VMs and POST them to Jira"""
         try:
-            # Get VMs by IDs from database
-            import asyncio
-            from bson import ObjectId
-            
             logger.info(f"Processing {len(vm_ids)} selected VMs for Jira posting")
             
             # Get collections
@@ -507,7 +822,9 @@ class JiraPosterService:
                 }
             
             # Find VMs by ObjectIds
-            selected_vms = list(self.missing_collection.find({'_id': {'$in': object_ids}}))
+            selected_vms = list(
+                self.missing_collection.find({'_id': {'$in': object_ids}}).batch_size(200)
+            )
             
             if not selected_vms:
                 return {
@@ -521,70 +838,9 @@ class JiraPosterService:
             
             logger.info(f"Found {len(selected_vms)} VMs to process")
             
-            # Statistics
-            stats = {
-                'status': 'success',
-                'processed': 0,
-                'successful': 0,
-                'failed': 0,
-                'results': [],
-                'start_time': datetime.utcnow(),
-                'processing_time': 0
-            }
-            
-            start_time = time.time()
-            
-            # Process each selected VM
-            for i, vm_doc in enumerate(selected_vms, 1):
-                vm_name = vm_doc.get('vm_name', 'Unknown')
-                
-                logger.info(f"📤 [{i}/{len(selected_vms)}] Processing selected VM: {vm_name}")
-                
-                # POST to Jira
-                post_result = self.post_vm_to_jira(vm_doc)
-                
-                stats['processed'] += 1
-                
-                if post_result['success']:
-                    stats['successful'] += 1
-                    self.move_to_completed(vm_doc, post_result)
-                    
-                    stats['results'].append({
-                        'vm_name': vm_name,
-                        'status': 'success',
-                        'object_key': post_result.get('object_key'),
-                        'message': f"Created as {post_result.get('object_key')}"
-                    })
-                    
-                else:
-                    stats['failed'] += 1
-                    self.mark_as_failed(vm_doc, post_result)
-                    
-                    stats['results'].append({
-                        'vm_name': vm_name,
-                        'status': 'failed',
-                        'error': post_result.get('error'),
-                        'status_code': post_result.get('status_code'),
-                        'message': f"Failed: {post_result.get('error')}"
-                    })
-                
-                # Apply rate limiting delay
-                if i < len(selected_vms) and delay > 0:
-                    time.sleep(delay)
-            
-            # Calculate final statistics
-            end_time = time.time()
-            stats['processing_time'] = end_time - start_time
-            
-            logger.info("=" * 50)
-            logger.info("SELECTED VMs JIRA POSTER RESULTS:")
-            logger.info(f"Selected VMs: {len(selected_vms)}")
-            logger.info(f"Successful POSTs: {stats['successful']}")
-            logger.info(f"Failed POSTs: {stats['failed']}")
-            logger.info(f"Processing time: {stats['processing_time']:.2f} seconds")
-            logger.info("=" * 50)
-            
-            return stats
+            return self._process_vm_list(
+                selected_vms, delay, max_concurrency, log_label="Processing selected VM"
+            )
             
         except Exception as e:
             logger.error(f"Error processing selected VMs: {e}")
@@ -3,68 +3,101 @@ Jira VM collection and processing service with multiprocessing
 """
 
 import time
+import heapq
 import logging
-from multiprocessing import Pool
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
-from app.services.jira_service import JiraService
+from app.services.jira_service import JiraService, vm_object_fingerprint
 from app.services.database_service import DatabaseService
 from app.core.config import settings
+from app.utils.utils import configure_worker_logging, get_pool_context, log_processing_progress, plan_batches
 
 logger = logging.getLogger(__name__)
 
 
-def process_jira_vm_batch(args):
-    """Process Jira VM batch - for multiprocessing"""
-    vm_batch, jira_config, batch_id = args
+def split_vms_by_weight(vms: List[Dict[str, Any]], batch_count: int) -> List[List[Dict[str, Any]]]:
+    """Split VMs into batches of roughly equal extraction work
+    
+    extract_vm_data cost grows with the attribute count, so batches are packed
+    greedily (heaviest VM first into the lightest batch) instead of by VM count.
+    """
+    batch_count = max(1, min(batch_count, len(vms)))
+    heap = [(0, i, []) for i in range(batch_count)]
+    
+    for vm in sorted(vms, key=lambda v: len(v.get('attributes', [])), reverse=True):
+        total, i, batch = heapq.heappop(heap)
+        batch.append(vm)
+        heapq.heappush(heap, (total + (len(vm.get('attributes', [])) or 1), i, batch))
     
-    # Create new service instance for each process
-    jira_service = JiraService(
+    return [batch for _, _, batch in sorted(heap, key=lambda entry: entry[1]) if batch]
+
+
+# Worker process state: JiraService, DatabaseService
+_worker_state = {}
+
+
+def init_jira_worker(jira_config: Dict[str, Any]):
+    """Pool initializer - create the worker's services once instead of per batch"""
+    configure_worker_logging()
+    _worker_state.clear()
+    _worker_state['jira'] = JiraService(
         api_url=jira_config['api_url'],
         token=jira_config['token'],
         object_type_id=jira_config['object_type_id'],
         object_schema_id=jira_config['object_schema_id'],
         #cookie=jira_config.get('cookie', '')
     )
+    _worker_state['db'] = DatabaseService()
+
+
+def process_jira_vm_batch(args):
+    """Process Jira VM batch - for multiprocessing (Pool started with init_jira_worker)"""
+    vm_batch, batch_id = args
     
-    database_service = DatabaseService()
+    # Worker's services (created in the initializer)
+    jira_service = _worker_state['jira']
+    database_service = _worker_state['db']
     
     try:
-        batch_vm_data = []
-        batch_processed = 0
-        batch_errors = 0
+        batch_now = datetime.utcnow()
         
-        for jira_vm in vm_batch:
-            try:
-                # Extract VM data
-                vm_data = jira_service.extract_vm_data(jira_vm)
-                if vm_data:
-                    batch_vm_data.append(vm_data)
-                    batch_processed += 1
-                    
-                    # Log tag count
-                    tag_count = len(vm_data.get('tags', [{}])[0]) if vm_data.get('tags') else 0
-                    if tag_count > 0:
-                        logger.debug(f"VM {vm_data['name']}: found {tag_count} tags")
-                else:
-                    batch_errors += 1
-                    
-            except Exception as e:
-                logger.error(f"Error processing VM {jira_vm.get('objectKey', 'Unknown')}: {e}")
-                batch_errors += 1
+        # Skip objects whose content is unchanged since the last collection
+        fingerprints = {
+            jira_vm['objectKey']: vm_object_fingerprint(jira_vm)
+            for jira_vm in vm_batch if jira_vm.get('objectKey')
+        }
+        stored = database_service.get_jira_vm_fingerprints(list(fingerprints))
+        unchanged_keys = [key for key, fp in fingerprints.items() if stored.get(key) == fp]
+        unchanged = set(unchanged_keys)
+        changed_vms = [jira_vm for jira_vm in vm_batch if jira_vm.get('objectKey') not in unchanged]
+        database_service.touch_jira_vms(unchanged_keys, batch_now)
+        
+        # Extract the changed VMs (one timestamp), then one bulk upsert
+        batch_vm_data, batch_errors = jira_service.extract_vm_batch(changed_vms, batch_now)
+        for vm_data in batch_vm_data:
+            vm_data['jira_fingerprint'] = fingerprints.get(vm_data['jira_object_key'])
+        batch_processed = len(batch_vm_data) + len(unchanged_keys)
+        
+        # Log tag count
+        if logger.isEnabledFor(logging.DEBUG):
+            for vm_data in batch_vm_data:
+                tag_count = len(vm_data['tags'][0]) if vm_data.get('tags') else 0
+                if tag_count > 0:
+                    logger.debug("VM %s: found %d tags", vm_data['name'], tag_count)
         
         # Bulk write to database
         if batch_vm_data:
             # Use special collection for Jira VMs
             result = database_service.bulk_upsert_jira_vms(batch_vm_data)
-            logger.info(f"Batch {batch_id}: {result['upserted']} new, {result['modified']} updated")
+            logger.info(f"Batch {batch_id}: {result['upserted']} new, {result['modified']} updated, {len(unchanged_keys)} unchanged")
         
         return {
             'batch_id': batch_id,
             'processed': batch_processed,
+            'unchanged': len(unchanged_keys),
             'errors': batch_errors,
-            'message': f'{batch_processed} processed (Jira Asset), {batch_errors} errors'
+            'message': f'{batch_processed} processed (Jira Asset, {len(unchanged_keys)} unchanged), {batch_errors} errors'
         }
         
     except Exception as e:
@@ -105,7 +138,6 @@ class JiraProcessingService:
             'cookie': cookie or ""
         }
         
-        batch_size = batch_size or settings.batch_size
         max_processes = max_processes or settings.max_processes
         
         # Configure Jira service
@@ -130,13 +162,19 @@ class JiraProcessingService:
                     'errors': 0
                 }
             
+            # Batch size / process count from the VM count (unless batch_size was given)
+            batch_size, max_processes = plan_batches(len(all_vms), batch_size, max_processes)
+            logger.info(f"batch_size={batch_size}, max_processes={max_processes}")
+            
             # Split VMs into batches
-            vm_batches = [all_vms[i:i + batch_size] for i in range(0, len(all_vms), batch_size)]
+            # Same batch count as fixed slicing, balanced by attribute count
+            batch_count = (len(all_vms) + batch_size - 1) // batch_size
+            vm_batches = split_vms_by_weight(all_vms, batch_count)
             logger.info(f"Split {len(all_vms)} VMs into {len(vm_batches)} batches")
             
             # Prepare batch arguments
             batch_args = [
-                (batch, jira_config, i+1)
+                (batch, i+1)
                 for i, batch in enumerate(vm_batches)
             ]
             
@@ -144,22 +182,32 @@ class JiraProcessingService:
             start_time = time.time()
             logger.info(f"Starting multiprocessing with {max_processes} processes - Jira Asset VM Collection")
             
-            with Pool(processes=max_processes) as pool:
-                results = pool.map(process_jira_vm_batch, batch_args)
+            # Batches are short CPU work - send several per IPC round trip
+            # (same heuristic as Pool.map: ~4 chunks per worker)
+            chunksize = max(1, len(batch_args) // (max_processes * 4))
+            
+            # Stream batch results as workers finish (log and count straight away)
+            results = []
+            total_processed = 0
+            total_errors = 0
+            logger.info("=" * 50)
+            logger.info("JIRA VM COLLECTION DETAILS:")
+            pool_context = get_pool_context()
+            with pool_context.Pool(processes=max_processes, initializer=init_jira_worker,
+                                   initargs=(jira_config,)) as pool:
+                for result in pool.imap_unordered(process_jira_vm_batch, batch_args, chunksize=chunksize):
+                    results.append(result)
+                    total_processed += result['processed']
+                    total_errors += result['errors']
+                    logger.info(f"Batch {result['batch_id']}: {result['message']}")
+                    log_processing_progress(total_processed + total_errors, len(all_vms), "Jira VM progress")
             
             end_time = time.time()
             
-            # Calculate results
-            total_processed = sum(r['processed'] for r in results)
-            total_errors = sum(r['errors'] for r in results)
+            # Keep batches in submission order for the response
+            results.sort(key=lambda r: r['batch_id'])
             processing_time = end_time - start_time
             
-            # Log results
-            logger.info("=" * 50)
-            logger.info("JIRA VM COLLECTION DETAILS:")
-            for result in results:
-                logger.info(f"Batch {result['batch_id']}: {result['message']}")
-            
             logger.info("=" * 50)
             logger.info("OVERALL RESULTS:")
             logger.info(f"Total VMs: {len(all_vms)}")
@@ -2,20 +2,225 @@
 Jira Asset Management integration service
 """
 
+import os
+import sys
 import json
+import time
+import hashlib
 import logging
+import threading
 import requests
 import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Set, Tuple, Union
 
 from app.core.config import settings
+from app.utils.utils import dumps_json, loads_json
 
 # Disable SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 logger = logging.getLogger(__name__)
 
+# Seconds a full object type download (label -> object key index) is reused
+_LABEL_INDEX_TTL = 60
+
+# Consecutive failed API calls that open the circuit, and how long it stays open (seconds)
+_BREAKER_THRESHOLD = 5
+_BREAKER_COOLDOWN = 30
+
+# Shared read-only default for missing nested objects (never mutated)
+_EMPTY: Dict[str, Any] = {}
+
+
+def _reference_value(value_obj: Dict[str, Any]) -> Dict[str, Any]:
+    """Reference attribute value -> stored reference dict"""
+    referenced_obj = value_obj.get('referencedObject') or _EMPTY
+    return {
+        'id': referenced_obj.get('id'),
+        'name': referenced_obj.get('name'),
+        'label': referenced_obj.get('label'),
+        'object_key': referenced_obj.get('objectKey')
+    }
+
+
+# Jira attribute -> tag key ('System' after 'SystemName' so it wins when both are set)
+_TAG_MAPPING = (
+    ('SystemName', 'System'),
+    ('Zone', 'Zone'),
+    ('Environment', 'Environment'),
+    ('Component', 'Component'),
+    ('ComponentType', 'ComponentType'),
+    ('Team', 'Team'),
+    ('System', 'System'),
+)
+
+# Jira attribute -> vm_data field, copied as is
+_SIMPLE_FIELDS = (
+    ('VMName', 'vm_name'),
+    ('DNSName', 'dns_name'),
+    ('IPAddress', 'ip_address'),
+    ('SecondaryIP', 'secondary_ip'),
+    ('SecondaryIP2', 'secondary_ip2'),
+    ('ResourcePool', 'resource_pool'),
+    ('Datastore', 'datastore'),
+    ('ESXiCluster', 'esxi_cluster'),
+    ('ESXiHost', 'esxi_host'),
+    ('ESXiPortGroup', 'esxi_port_group'),
+    ('Site', 'site'),
+    ('Description', 'description'),
+    ('JiraTicket', 'jira_ticket'),
+    ('CriticalityLevel', 'criticality_level'),
+    ('CreatedBY', 'created_by'),
+    ('NeedBackup', 'need_backup'),
+    ('BackupType', 'backup_type'),
+    ('NeedMonitoring', 'need_monitoring'),
+)
+
+# Enumerated attributes - a handful of distinct values repeated across all VMs
+_INTERN_FIELDS = frozenset({
+    'Environment', 'Zone', 'Component', 'ComponentType', 'Team', 'System',
+    'SystemName', 'Site', 'CriticalityLevel', 'BackupType', 'NeedBackup',
+    'NeedMonitoring', 'OperatingSystem', 'Platform', 'ESXiCluster',
+})
+
+
+def _slim_attribute_value(value_obj: Dict[str, Any], intern: bool = False) -> Dict[str, Any]:
+    """Keep only the parts of an objectAttributeValue that extract_vm_data reads
+    
+    With intern=True the value (or the reference name/label) is interned.
+    """
+    value = value_obj.get('value')
+    slim = {'value': _intern_name(value) if intern else value}
+    if value_obj.get('referencedType'):
+        referenced_obj = value_obj.get('referencedObject', {})
+        name = referenced_obj.get('name')
+        label = referenced_obj.get('label')
+        if intern:
+            name = _intern_name(name)
+            label = _intern_name(label)
+        slim['referencedType'] = value_obj['referencedType']
+        slim['referencedObject'] = {
+            'id': referenced_obj.get('id'),
+            'name': name,
+            'label': label,
+            'objectKey': referenced_obj.get('objectKey')
+        }
+    if 'user' in value_obj:
+        user = value_obj.get('user') or {}
+        slim['user'] = {
+            'name': user.get('name'),
+            'displayName': user.get('displayName'),
+            'key': user.get('key')
+        }
+    return slim
+
+
+def _intern_name(name: Any) -> Any:
+    """Intern repeated strings - attribute names (keys of every extracted
+    document) and values of the _INTERN_FIELDS attributes"""
+    return sys.intern(name) if type(name) is str else name
+
+
+def _slim_attribute(attr: Dict[str, Any]) -> Dict[str, Any]:
+    """Slim one navlist attribute (name + values)"""
+    name = _intern_name((attr.get('objectTypeAttribute') or {}).get('name'))
+    intern = name in _INTERN_FIELDS
+    return {
+        'objectTypeAttribute': {'name': name},
+        'objectAttributeValues': [
+            _slim_attribute_value(value_obj, intern) for value_obj in attr.get('objectAttributeValues') or []
+        ]
+    }
+
+
+def slim_vm_object(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop the Jira metadata extract_vm_data never reads from a navlist entry
+    
+    Every attribute carries its full objectTypeAttribute definition and every
+    reference its full object (object type, avatar, links). Only names and
+    values are kept, so all_vms is a fraction of the decoded page in memory and
+    in the pickles sent to the Pool workers. Attribute names and enumerated
+    values are interned, so all VMs share one string object per distinct value
+    (pickle memoizes it per batch too).
+    """
+    return {
+        'id': entry.get('id'),
+        'objectKey': entry.get('objectKey'),
+        'label': entry.get('label', ''),
+        'created': entry.get('created'),
+        'updated': entry.get('updated'),
+        'attributes': [_slim_attribute(attr) for attr in entry.get('attributes', [])]
+    }
+
+
+# Bump when extract_vm_data output changes, so unchanged Jira objects are re-extracted once
+_FINGERPRINT_VERSION = b'1'
+
+
+def vm_object_fingerprint(entry: Dict[str, Any]) -> str:
+    """Content hash of a (slim) navlist entry - equal hash means nothing to re-extract"""
+    return hashlib.blake2b(
+        _FINGERPRINT_VERSION + dumps_json(entry, sort_keys=True), digest_size=16
+    ).hexdigest()
+
+
+def _to_int(value: Any) -> int:
+    """Jira numeric attribute -> int (0 when empty or not a number)"""
+    try:
+        return int(value) if value else 0
+    except (ValueError, TypeError):
+        return 0
+
+
+_sessions: Dict[Tuple[int, str, str], requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def _jira_session(token: str, cookie: str) -> requests.Session:
+    """Pooled Jira session - one per (process, token, cookie), reused by every JiraService"""
+    key = (os.getpid(), token, cookie)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            session.verify = False
+            
+            # Keep-alive pool shared by pagination and the parallel ITAM fetches.
+            # IQL POSTs are read-only queries, so retrying them on 5xx/429 is safe
+            adapter = HTTPAdapter(
+                pool_connections=10,
+                pool_maxsize=20,
+                max_retries=Retry(
+                    total=3,
+                    backoff_factor=0.3,
+                    status_forcelist=[429, 500, 502, 503, 504],
+                    allowed_methods=['GET', 'POST'],
+                    raise_on_status=False
+                )
+            )
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            
+            headers = {
+                'Content-Type': 'application/json',
+                'Accept': 'application/json',
+                'User-Agent': 'VMware-Collector/1.0'
+            }
+            if token and token != "your_token_here":
+                headers['Authorization'] = f"Bearer {token}"
+            # Add cookie if available (this might be the main auth method)
+            if cookie:
+                headers['Cookie'] = cookie
+            session.headers.update(headers)
+            
+            _sessions[key] = session
+            logger.info("Jira API session created")
+    return session
+
 
 class JiraService:
     """Jira Asset Management service class"""
@@ -28,91 +233,96 @@ class JiraService:
         self.object_schema_id = object_schema_id or "242"
         self.cookie = cookie or ""
         self.session = None
+        # object_type_id -> (fetched_at, label -> object key)
+        self._label_index_cache = {}
+        # results_per_page -> pre-serialized navlist body up to the "page" value
+        self._page_body_prefix = {}
+        # Circuit breaker for fetch_data_from_api (shared by the lookup threads)
+        self._failures = 0
+        self._breaker_open_until = 0.0
+        self._breaker_lock = threading.Lock()
         
     def get_session(self):
-        """Get Jira API session"""
+        """Get Jira API session (pooled keep-alive session shared per process)"""
         try:
             if self.session:
                 return self.session
-                
-            session = requests.Session()
-            session.verify = False
             
-            # Add authorization headers - try multiple formats
-            headers = {
+            self.session = _jira_session(self.token, self.cookie)
+            return self.session
+            
+        except Exception as e:
+            logger.error(f"Jira session creation failed: {e}")
+            return None
+    
+    def post_query(self, session: requests.Session, payload: Union[Dict[str, Any], bytes]) -> requests.Response:
+        """POST an IQL query, falling back to cookie-only auth on the first 401
+        
+        Replaces the old per-instance test request: auth is checked on the first
+        real call instead of costing an extra round trip for every JiraService.
+        The payload may already be serialized JSON bytes.
+        """
+        body = payload if isinstance(payload, bytes) else dumps_json(payload)
+        response = session.post(
+            self.api_url,
+            data=body,
+            headers={'Content-Type': 'application/json'}
+        )
+        
+        if response.status_code == 401 and self.cookie and 'Authorization' in session.headers:
+            logger.warning("Jira returned 401 with Bearer token - trying cookie-only authentication")
+            cookie_headers = {
                 'Content-Type': 'application/json',
                 'Accept': 'application/json',
-                'User-Agent': 'VMware-Collector/1.0'
+                'Cookie': self.cookie
             }
+            cookie_response = session.post(self.api_url, data=body, headers=cookie_headers)
             
-            # Try different authentication methods
-            if self.token and self.token != "your_token_here":
-                # Method 1: Bearer token
-                headers['Authorization'] = f"Bearer {self.token}"
-                print(f"DEBUG: Using Bearer token: {self.token[:20]}...")
-                
-            # Add cookie if available (this might be the main auth method)
-            if self.cookie:
-                headers['Cookie'] = self.cookie
-                print(f"DEBUG: Using cookie: {self.cookie[:50]}...")
-            
-            session.headers.update(headers)
-            
-            # Test the session with a simple request
-            try:
-                test_payload = {
-                    "objectTypeId": self.object_type_id,
-                    "attributesToDisplay": {"attributesToDisplayIds": []},
-                    "resultsPerPage": 1,
-                    "includeAttributes": False,
-                    "objectSchemaId": self.object_schema_id,
-                    "qlQuery": ""
-                }
-                
-                print(f"DEBUG: Testing auth with URL: {self.api_url}")
-                print(f"DEBUG: Payload: {test_payload}")
-                print(f"DEBUG: Headers: {headers}")
-                
-                test_response = session.post(self.api_url, json=test_payload)
-                print(f"DEBUG: Response status: {test_response.status_code}")
-                print(f"DEBUG: Response headers: {dict(test_response.headers)}")
-                print(f"DEBUG: Response body: {test_response.text[:300]}")
-                
-                if test_response.status_code == 401:
-                    print("ERROR: 401 - Authentication failed")
-                    
-                    # Try cookie-only authentication
-                    if self.cookie:
-                        cookie_headers = {
-                            'Content-Type': 'application/json',
-                            'Accept': 'application/json',
-                            'Cookie': self.cookie
-                        }
-                        cookie_response = session.post(self.api_url, json=test_payload, headers=cookie_headers)
-                        print(f"DEBUG: Cookie-only auth response: {cookie_response.status_code}")
-                        
-                        if cookie_response.status_code == 200:
-                            print("SUCCESS: Cookie authentication works")
-                            session.headers.clear()
-                            session.headers.update(cookie_headers)
-                        
-                elif test_response.status_code == 200:
-                    print("SUCCESS: Authentication successful")
-                else:
-                    print(f"WARNING: Unexpected status: {test_response.status_code}")
-                    
-            except Exception as e:
-                print(f"ERROR: Authentication test exception: {e}")
-            
-            self.session = session
-            return session
-            
-        except Exception as e:
-            print(f"ERROR: Session creation failed: {e}")
+            if cookie_response.status_code == 200:
+                logger.info("Cookie authentication works - session switched to cookie-only")
+                session.headers.pop('Authorization', None)
+                session.headers.update(cookie_headers)
+                return cookie_response
+        
+        return response
+    
+    def fetch_vm_page(self, session: requests.Session, page: int,
+                      results_per_page: int) -> Optional[Dict[str, Any]]:
+        """Fetch one navlist page of VM objects (None on API error)"""
+        # Only "page" changes between requests - serialize the rest once
+        prefix = self._page_body_prefix.get(results_per_page)
+        if prefix is None:
+            payload = {
+                "objectTypeId": self.object_type_id,
+                "attributesToDisplay": {
+                    "attributesToDisplayIds": []
+                },
+                "resultsPerPage": results_per_page,
+                "includeAttributes": True,
+                "objectSchemaId": self.object_schema_id,
+                "qlQuery": ""
+            }
+            prefix = dumps_json(payload)[:-1] + b',"page":'
+            self._page_body_prefix[results_per_page] = prefix
+        
+        response = self.post_query(session, b'%s%d}' % (prefix, page))
+        
+        if response.status_code != 200:
+            logger.error(f"API request error (page {page}): {response.status_code} - {response.text}")
             return None
+        
+        data = loads_json(response.content)
+        # Slim the entries right away - the full page tree is released with this frame
+        data['objectEntries'] = [slim_vm_object(entry) for entry in data.get('objectEntries', [])]
+        return data
     
     def get_all_vm_objects(self) -> List[Dict[str, Any]]:
-        """Get all VM objects from Jira"""
+        """Get all VM objects from Jira
+        
+        Page 1 tells the total count, the remaining pages are then fetched in
+        parallel over the shared keep-alive session. Falls back to the page by
+        page loop when the response has no totalFilterCount.
+        """
         try:
             session = self.get_session()
             if not session:
@@ -122,42 +332,52 @@ class JiraService:
             page = 1
             results_per_page = 100  # Larger batch for performance
             
-            while True:
-                logger.info(f"Loading page {page}...")
-                
-                payload = {
-                    "objectTypeId": self.object_type_id,
-                    "attributesToDisplay": {
-                        "attributesToDisplayIds": []
-                    },
-                    "resultsPerPage": results_per_page,
-                    "includeAttributes": True,
-                    "objectSchemaId": self.object_schema_id,
-                    "qlQuery": "",
-                    "page": page
-                }
-                
-                response = session.post(self.api_url, json=payload)
-                
-                if response.status_code != 200:
-                    logger.error(f"API request error: {response.status_code} - {response.text}")
-                    break
-                
-                data = response.json()
-                vm_objects = data.get('objectEntries', [])
-                
-                if not vm_objects:
-                    logger.info("No more VMs found, collection completed")
-                    break
-                
-                all_vms.extend(vm_objects)
-                logger.info(f"Page {page}: retrieved {len(vm_objects)} VMs")
-                
-                # If this page has fewer VMs than requested, it's the last page
-                if len(vm_objects) < results_per_page:
-                    break
+            logger.info(f"Loading page {page}...")
+            data = self.fetch_vm_page(session, page, results_per_page)
+            if data is None:
+                return all_vms
+            
+            vm_objects = data.get('objectEntries', [])
+            all_vms.extend(vm_objects)
+            logger.info(f"Page {page}: retrieved {len(vm_objects)} VMs")
+            
+            total_count = data.get('totalFilterCount')
+            
+            if isinstance(total_count, int):
+                total_pages = (total_count + results_per_page - 1) // results_per_page
+                if total_pages > 1 and vm_objects:
+                    logger.info(f"Loading pages 2-{total_pages} in parallel ({total_count} VMs)...")
+                    
+                    with ThreadPoolExecutor(max_workers=min(8, total_pages - 1)) as executor:
+                        pages = executor.map(
+                            lambda p: self.fetch_vm_page(session, p, results_per_page),
+                            range(2, total_pages + 1)
+                        )
+                        
+                        # Results come back in page order; stop at the first failed page
+                        for page, page_data in enumerate(pages, 2):
+                            if page_data is None:
+                                break
+                            vm_objects = page_data.get('objectEntries', [])
+                            all_vms.extend(vm_objects)
+                            logger.info(f"Page {page}: retrieved {len(vm_objects)} VMs")
+            else:
+                # No total count - page by page until a short/empty page
+                while len(vm_objects) == results_per_page:
+                    page += 1
+                    logger.info(f"Loading page {page}...")
+                    
+                    data = self.fetch_vm_page(session, page, results_per_page)
+                    if data is None:
+                        break
+                    
+                    vm_objects = data.get('objectEntries', [])
+                    if not vm_objects:
+                        logger.info("No more VMs found, collection completed")
+                        break
                     
-                page += 1
+                    all_vms.extend(vm_objects)
+                    logger.info(f"Page {page}: retrieved {len(vm_objects)} VMs")
             
             logger.info(f"Total {len(all_vms)} VMs retrieved")
             return all_vms
@@ -169,7 +389,7 @@ class JiraService:
     def extract_vmid_from_attributes(self, attribute_data: Dict[str, Any]) -> Optional[str]:
         """✅ YENİ - Extract VMID from Jira attributes using multiple field mappings"""
         
-        logger.debug(f"🔍 Searching for VMID in {len(attribute_data)} attributes")
+        logger.debug("🔍 Searching for VMID in %s attributes", len(attribute_data))
         
         # Try all possible VMID field mappings
         for field_mapping in self.vmid_field_mappings:
@@ -191,7 +411,7 @@ class JiraService:
                     continue
                 
                 if vmid and str(vmid).strip():
-                    logger.info(f"✅ VMID found via field '{field_mapping}': {vmid}")
+                    logger.debug("✅ VMID found via field '%s': %s", field_mapping, vmid)
                     return str(vmid).strip()
         
         # Fallback: Look for any field containing 'vmid' or 'id' in name
@@ -214,14 +434,18 @@ class JiraService:
                         continue
                     
                     if vmid and str(vmid).strip():
-                        logger.info(f"✅ VMID found via fallback field '{attr_name}': {vmid}")
+                        logger.debug("✅ VMID found via fallback field '%s': %s", attr_name, vmid)
                         return str(vmid).strip()
         
         logger.warning("❌ No VMID found in Jira attributes")
         return None
 
-    def extract_vm_data(self, jira_vm_object: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Extract structured data from Jira VM object - ENHANCED WITH VMID"""
+    def extract_vm_data(self, jira_vm_object: Dict[str, Any],
+                        now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """Extract structured data from Jira VM object - ENHANCED WITH VMID
+        
+        now: batch timestamp for last_updated (defaults to the current time)
+        """
         try:
             vm_data = {
                 'jira_object_id': jira_vm_object.get('id'),
@@ -229,19 +453,22 @@ class JiraService:
                 'name': jira_vm_object.get('label', '').strip(),
                 'created_date': jira_vm_object.get('created'),
                 'updated_date': jira_vm_object.get('updated'),
-                'last_updated': datetime.utcnow(),
+                'last_updated': now or datetime.utcnow(),
                 'data_source': 'jira_asset_management'
             }
             
             # Extract data from attributes
-            attributes = jira_vm_object.get('attributes', [])
+            attributes = jira_vm_object.get('attributes') or ()
             attribute_data = {}
             
             for attr in attributes:
-                attr_name = attr.get('objectTypeAttribute', {}).get('name')
-                attr_values = attr.get('objectAttributeValues', [])
+                type_attr = attr.get('objectTypeAttribute')
+                attr_values = attr.get('objectAttributeValues')
+                if not type_attr or not attr_values:
+                    continue
                 
-                if not attr_name or not attr_values:
+                attr_name = type_attr.get('name')
+                if not attr_name:
                     continue
                 
                 # Handle different attribute types for value extraction
@@ -250,16 +477,10 @@ class JiraService:
                     
                     # Reference type (reference to another object)
                     if value_obj.get('referencedType'):
-                        referenced_obj = value_obj.get('referencedObject', {})
-                        attribute_data[attr_name] = {
-                            'id': referenced_obj.get('id'),
-                            'name': referenced_obj.get('name'),
-                            'label': referenced_obj.get('label'),
-                            'object_key': referenced_obj.get('objectKey')
-                        }
+                        attribute_data[attr_name] = _reference_value(value_obj)
                     # User type
                     elif 'user' in value_obj:
-                        user = value_obj.get('user', {})
+                        user = value_obj['user'] or _EMPTY
                         attribute_data[attr_name] = {
                             'name': user.get('name'),
                             'display_name': user.get('displayName'),
@@ -271,19 +492,10 @@ class JiraService:
                 
                 # Multiple values
                 else:
-                    values = []
-                    for value_obj in attr_values:
-                        if value_obj.get('referencedType'):
-                            referenced_obj = value_obj.get('referencedObject', {})
-                            values.append({
-                                'id': referenced_obj.get('id'),
-                                'name': referenced_obj.get('name'),
-                                'label': referenced_obj.get('label'),
-                                'object_key': referenced_obj.get('objectKey')
-                            })
-                        else:
-                            values.append(value_obj.get('value'))
-                    attribute_data[attr_name] = values
+                    attribute_data[attr_name] = [
+                        _reference_value(value_obj) if value_obj.get('referencedType') else value_obj.get('value')
+                        for value_obj in attr_values
+                    ]
             
             # ✅ YENİ - Extract VMID from attributes
             vmid = self.extract_vmid_from_attributes(attribute_data)
@@ -291,7 +503,7 @@ class JiraService:
                 vm_data['vmid'] = vmid
                 vm_data['VMID'] = vmid  # Also store as uppercase variant
                 vm_data['vm_id'] = vmid  # Also store as underscore variant
-                logger.info(f"VM {vm_data['name']}: VMID = {vmid}")
+                logger.debug("VM %s: VMID = %s", vm_data['name'], vmid)
             else:
                 # Generate fallback VMID from object key or ID
                 vmid = (vm_data.get('jira_object_key') or 
@@ -299,7 +511,7 @@ class JiraService:
                 vm_data['vmid'] = vmid
                 vm_data['VMID'] = vmid
                 vm_data['vm_id'] = vmid
-                logger.info(f"VM {vm_data['name']}: Generated fallback VMID = {vmid}")
+                logger.debug("VM %s: Generated fallback VMID = %s", vm_data['name'], vmid)
             
             # Add structured data
             vm_data.update(attribute_data)
@@ -309,20 +521,9 @@ class JiraService:
             jira_tags = {}
             
             # Map attributes to tag format
-            tag_mapping = {
-                'SystemName': 'System',
-                'Zone': 'Zone', 
-                'Environment': 'Environment',
-                'Component': 'Component',
-                'ComponentType': 'ComponentType',
-                'Team': 'Team',
-                'System': 'System'
-            }
-            
-            for jira_attr, tag_key in tag_mapping.items():
-                if jira_attr in attribute_data and attribute_data[jira_attr]:
-                    attr_value = attribute_data[jira_attr]
-                    
+            for jira_attr, tag_key in _TAG_MAPPING:
+                attr_value = attribute_data.get(jira_attr)
+                if attr_value:
                     # If reference type, get name field
                     if isinstance(attr_value, dict) and 'name' in attr_value:
                         tags[tag_key] = attr_value['name']
@@ -349,76 +550,38 @@ class JiraService:
             logger.error(f"Error extracting VM data for {jira_vm_object.get('objectKey', 'Unknown')}: {e}")
             return None
     
+    def extract_vm_batch(self, jira_vm_objects: List[Dict[str, Any]],
+                         now: Optional[datetime] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """Extract a batch of Jira VM objects with one shared timestamp
+        
+        Returns:
+            (extracted VM documents ready for one bulk upsert, number of VMs that failed)
+        """
+        now = now or datetime.utcnow()
+        extract = self.extract_vm_data
+        
+        extracted = [extract(jira_vm_object, now) for jira_vm_object in jira_vm_objects]
+        vm_data_list = [vm_data for vm_data in extracted if vm_data]
+        
+        return vm_data_list, len(extracted) - len(vm_data_list)
+    
     def _map_vm_details(self, vm_data: Dict[str, Any], attribute_data: Dict[str, Any]):
         """Map VM attributes to structured data"""
         
-        # Basic VM info
-        if 'VMName' in attribute_data:
-            vm_data['vm_name'] = attribute_data['VMName']
-        if 'DNSName' in attribute_data:
-            vm_data['dns_name'] = attribute_data['DNSName']
-        
-        # Network info
-        if 'IPAddress' in attribute_data:
-            vm_data['ip_address'] = attribute_data['IPAddress']
-        if 'SecondaryIP' in attribute_data:
-            vm_data['secondary_ip'] = attribute_data['SecondaryIP']
-        if 'SecondaryIP2' in attribute_data:
-            vm_data['secondary_ip2'] = attribute_data['SecondaryIP2']
+        # Plain copies (VM, network, infrastructure, management and backup info)
+        for jira_attr, field in _SIMPLE_FIELDS:
+            if jira_attr in attribute_data:
+                vm_data[field] = attribute_data[jira_attr]
         
         # Hardware info
         if 'CPU' in attribute_data:
-            try:
-                vm_data['cpu_count'] = int(attribute_data['CPU']) if attribute_data['CPU'] else 0
-            except (ValueError, TypeError):
-                vm_data['cpu_count'] = 0
-                
+            vm_data['cpu_count'] = _to_int(attribute_data['CPU'])
         if 'Memory' in attribute_data:
-            try:
-                memory_gb = int(attribute_data['Memory']) if attribute_data['Memory'] else 0
-                vm_data['memory_gb'] = memory_gb
-                vm_data['memory_mb'] = memory_gb * 1024
-            except (ValueError, TypeError):
-                vm_data['memory_gb'] = 0
-                vm_data['memory_mb'] = 0
-                
+            memory_gb = _to_int(attribute_data['Memory'])
+            vm_data['memory_gb'] = memory_gb
+            vm_data['memory_mb'] = memory_gb * 1024
         if 'Disk' in attribute_data:
-            try:
-                vm_data['disk_gb'] = int(attribute_data['Disk']) if attribute_data['Disk'] else 0
-            except (ValueError, TypeError):
-                vm_data['disk_gb'] = 0
-        
-        # Infrastructure info
-        if 'ResourcePool' in attribute_data:
-            vm_data['resource_pool'] = attribute_data['ResourcePool']
-        if 'Datastore' in attribute_data:
-            vm_data['datastore'] = attribute_data['Datastore']
-        if 'ESXiCluster' in attribute_data:
-            vm_data['esxi_cluster'] = attribute_data['ESXiCluster']
-        if 'ESXiHost' in attribute_data:
-            vm_data['esxi_host'] = attribute_data['ESXiHost']
-        if 'ESXiPortGroup' in attribute_data:
-            vm_data['esxi_port_group'] = attribute_data['ESXiPortGroup']
-        
-        # Management info
-        if 'Site' in attribute_data:
-            vm_data['site'] = attribute_data['Site']
-        if 'Description' in attribute_data:
-            vm_data['description'] = attribute_data['Description']
-        if 'JiraTicket' in attribute_data:
-            vm_data['jira_ticket'] = attribute_data['JiraTicket']
-        if 'CriticalityLevel' in attribute_data:
-            vm_data['criticality_level'] = attribute_data['CriticalityLevel']
-        if 'CreatedBY' in attribute_data:
-            vm_data['created_by'] = attribute_data['CreatedBY']
-        
-        # Backup info
-        if 'NeedBackup' in attribute_data:
-            vm_data['need_backup'] = attribute_data['NeedBackup']
-        if 'BackupType' in attribute_data:
-            vm_data['backup_type'] = attribute_data['BackupType']
-        if 'NeedMonitoring' in attribute_data:
-            vm_data['need_monitoring'] = attribute_data['NeedMonitoring']
+            vm_data['disk_gb'] = _to_int(attribute_data['Disk'])
         
         # Operating System (reference object)
         if 'OperatingSystem' in attribute_data:
@@ -463,8 +626,61 @@ class JiraService:
                         return entry.get("objectKey")
         return None
 
-    def fetch_data_from_api(self, object_type_id: str) -> Optional[Dict[str, Any]]:
-        """Fetch data from Jira API"""
+    def build_label_index(self, data: Dict[str, Any]) -> Dict[str, Optional[str]]:
+        """Build label -> object key index (first matching entry wins, like get_object_key_by_label)"""
+        index = {}
+        for entry in data.get("objectEntries", []):
+            for attribute in entry.get("attributes", []):
+                object_type_attr = attribute.get("objectTypeAttribute", {})
+                attr_values = attribute.get("objectAttributeValues", [])
+                if object_type_attr.get("label") and attr_values:
+                    value = attr_values[0].get("value")
+                    if isinstance(value, str) and value not in index:
+                        index[value] = entry.get("objectKey")
+        return index
+
+    def get_label_index(self, object_type_id: str) -> Optional[Dict[str, Optional[str]]]:
+        """Label -> object key index of a whole object type, cached for _LABEL_INDEX_TTL
+        
+        A stale index is served when the refresh fails.
+        """
+        cached = self._label_index_cache.get(object_type_id)
+        if cached and time.monotonic() - cached[0] < _LABEL_INDEX_TTL:
+            return cached[1]
+        
+        data = self.fetch_data_from_api(object_type_id)
+        if not data:
+            if cached:
+                logger.warning(f"Object type {object_type_id} refresh failed, using cached ITAM index")
+                return cached[1]
+            return None
+        
+        label_index = self.build_label_index(data)
+        self._label_index_cache[object_type_id] = (time.monotonic(), label_index)
+        return label_index
+    
+    def _record_api_result(self, ok: bool):
+        """Count consecutive failures, open the circuit at _BREAKER_THRESHOLD"""
+        with self._breaker_lock:
+            if ok:
+                self._failures = 0
+                return
+            self._failures += 1
+            if self._failures >= _BREAKER_THRESHOLD:
+                self._breaker_open_until = time.monotonic() + _BREAKER_COOLDOWN
+                self._failures = 0
+                logger.error(f"Jira API failing - skipping calls for {_BREAKER_COOLDOWN} seconds")
+    
+    def fetch_data_from_api(self, object_type_id: str, ql_query: str = "") -> Optional[Dict[str, Any]]:
+        """Fetch data from Jira API (optionally narrowed by an IQL query)
+        
+        Returns None straight away while the circuit breaker is open, so a
+        degraded Jira does not cost a full timeout per looked up VM.
+        """
+        if time.monotonic() < self._breaker_open_until:
+            logger.debug("Jira circuit open, skipping object type %s", object_type_id)
+            return None
+        
         try:
             session = self.get_session()
             if not session:
@@ -476,41 +692,156 @@ class JiraService:
                 "resultsPerPage": 1000,
                 "includeAttributes": True,
                 "objectSchemaId": self.object_schema_id,
-                "qlQuery": ""
+                "qlQuery": ql_query
             }
             
-            response = session.post(self.api_url, json=payload)
+            response = self.post_query(session, payload)
             if response.status_code == 200:
-                return response.json()
+                self._record_api_result(True)
+                return loads_json(response.content)
             else:
                 logger.error(f"API call failed with status code {response.status_code}" )
+                # Only server side trouble counts - a bad query (4xx) is not an outage
+                if response.status_code == 429 or response.status_code >= 500:
+                    self._record_api_result(False)
                 return None
                 
         except Exception as e:
             logger.error(f"API request error: {e}")
+            self._record_api_result(False)
             return None
     
-    def get_itam_number_by_label(self, label: str, object_type_id: str) -> Optional[str]:
-        """Get ITAM number by label - with better error handling"""
+    def build_label_query(self, labels: Set[str]) -> str:
+        """Build an IQL query matching objects by any of the given names"""
+        quoted = []
+        for label in sorted(labels):
+            escaped = label.replace('\\', '\\\\').replace('"', '\\"')
+            quoted.append(f'"{escaped}"')
+        return f"Name IN ({', '.join(quoted)})"
+    
+    def get_label_index_for(self, object_type_id: str, labels: Set[str]) -> Tuple[Optional[Dict[str, Optional[str]]], bool]:
+        """Label -> object key index covering the given labels
+        
+        A fresh cached index of the whole object type is used as is. Otherwise
+        Jira is asked only for the objects named like the labels; the IQL
+        "Name" match is not the exact label attribute match of
+        build_label_index, so when the query fails or any label is missing
+        from its result, the whole object type is indexed instead.
+        
+        Returns:
+            (index, complete) - complete is False when the whole object type
+            could not be fetched, so a label missing from the index is unknown
+            rather than not found
+        """
+        cached = self._label_index_cache.get(object_type_id)
+        if cached and time.monotonic() - cached[0] < _LABEL_INDEX_TTL:
+            return cached[1], True
+        
+        label_index = None
+        data = self.fetch_data_from_api(object_type_id, self.build_label_query(labels))
+        if data is not None:
+            label_index = self.build_label_index(data)
+            missing = [label for label in labels if label not in label_index]
+            if not missing:
+                return label_index, True
+            logger.info(f"Filtered ITAM query for object type {object_type_id} missed {len(missing)}/{len(labels)} labels, scanning all objects")
+        else:
+            logger.warning(f"Filtered ITAM query failed for object type {object_type_id}, scanning all objects")
+        
+        # Whole object type (also served stale if the refresh fails)
+        full_index = self.get_label_index(object_type_id)
+        if full_index is not None:
+            return full_index, True
+        return label_index, False
+    
+    def _label_index_safe(self, object_type_id: str, labels: Set[str]) -> Tuple[Optional[Dict[str, Optional[str]]], bool]:
+        """get_label_index_for for worker threads - errors become (None, False)"""
+        try:
+            return self.get_label_index_for(object_type_id, labels)
+        except Exception as e:
+            logger.warning(f"Error getting ITAM numbers for object type {object_type_id}: {e}")
+            return None, False
+    
+    def find_itam_number(self, label: str, object_type_id: str) -> Tuple[bool, Optional[str]]:
+        """Look up the ITAM number of a label, telling Jira errors apart from misses
+        
+        Returns:
+            (answered, ITAM number) - answered is False when Jira could not be
+            asked (HTTP error, timeout, open circuit), so a None is not a
+            genuine "not found" and must not be cached
+        """
         try:
             # Skip ITAM lookup if no proper authentication
             if not self.token or self.token == "your_token_here":
                 logger.warning("No valid token available for ITAM lookup, skipping")
-                return None
+                return True, None
                 
-            data = self.fetch_data_from_api(object_type_id)
-            if not data:
-                logger.warning(f"No data received for object type {object_type_id}")
-                return None
-                
-            object_key = self.get_object_key_by_label(data, label)
+            # Filtered by name, whole object type when the label is not in the filtered result
+            label_index, complete = self.get_label_index_for(object_type_id, {label})
+            
+            object_key = (label_index or _EMPTY).get(label)
             if object_key and not object_key.startswith("No ObjectKey found"):
-                logger.debug(f"Label '{label}' ITAM: {object_key}")
-                return object_key
-            else:
-                logger.debug(f"ITAM not found for label '{label}' in object type {object_type_id}")
-                return None
+                logger.debug("Label '%s' ITAM: %s", label, object_key)
+                return True, object_key
+            
+            if not complete:
+                logger.warning(f"No data received for object type {object_type_id}")
+                return False, None
+            
+            logger.debug("ITAM not found for label '%s' in object type %s", label, object_type_id)
+            return True, None
                 
         except Exception as e:
             logger.warning(f"Error getting ITAM number for '{label}': {e}")
-            return None
\ No newline at end of file
+            return False, None
+    
+    def get_itam_number_by_label(self, label: str, object_type_id: str) -> Optional[str]:
+        """Get ITAM number by label - None when not found or Jira is unavailable"""
+        return self.find_itam_number(label, object_type_id)[1]
+
+    def bulk_get_itam_numbers(self, labels_by_type: Dict[str, Set[str]]) -> Dict[Tuple[str, str], Optional[str]]:
+        """Get ITAM numbers for many labels with one API call per object type
+        
+        Args:
+            labels_by_type: Object type ID -> labels to resolve
+            
+        Returns:
+            (label, object_type_id) -> ITAM number, None if not found. Labels
+            Jira could not answer for (see get_label_index_for) are left out.
+        """
+        results = {}
+        
+        # Skip ITAM lookup if no proper authentication
+        if not self.token or self.token == "your_token_here":
+            logger.warning("No valid token available for ITAM lookup, skipping")
+            for object_type_id, labels in labels_by_type.items():
+                for label in labels:
+                    results[(label, object_type_id)] = None
+            return results
+        
+        # One request per object type, narrowed to the wanted names and
+        # fetched in parallel on a shared session
+        self.get_session()
+        object_type_ids = list(labels_by_type)
+        label_sets = [labels_by_type[object_type_id] for object_type_id in object_type_ids]
+        with ThreadPoolExecutor(max_workers=max(len(object_type_ids), 1)) as executor:
+            indexes = dict(zip(object_type_ids, executor.map(self._label_index_safe, object_type_ids, label_sets)))
+        
+        for object_type_id, labels in labels_by_type.items():
+            label_index, complete = indexes[object_type_id]
+            if not complete:
+                logger.warning(f"No data received for object type {object_type_id}")
+            label_index = label_index or {}
+            
+            found_count = 0
+            for label in labels:
+                object_key = label_index.get(label)
+                if isinstance(object_key, str) and object_key and not object_key.startswith("No ObjectKey found"):
+                    results[(label, object_type_id)] = object_key
+                    found_count += 1
+                elif complete:
+                    results[(label, object_type_id)] = None
+            
+            logger.info(f"Object type {object_type_id}: {found_count}/{len(labels)} ITAM labels resolved")
+        
+        return results
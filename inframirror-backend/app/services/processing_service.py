@@ -4,7 +4,8 @@ VM collection and processing service with multiprocessing
 
 import time
 import logging
-from multiprocessing import Pool
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.util import Finalize
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
@@ -13,15 +14,46 @@ from pyVim.connect import Disconnect
 from app.services.vcenter_service import VCenterService
 from app.services.database_service import DatabaseService
 from app.core.config import settings
+from app.utils.utils import configure_worker_logging, get_pool_context, iter_chunks, log_processing_progress, plan_batches
 
 logger = logging.getLogger(__name__)
 
 
-def process_vm_batch(args):
-    """VM batch'ini emal et - multiprocessing üçün"""
-    vm_ref_batch, vcenter_config, batch_id = args
+# Worker prosesin state'i: config, DatabaseService, VCenterService, si, DB writer thread
+_worker_state = {}
+
+# Batch içində DB'yə bu ölçülü hissələrlə yazılır (yazı növbəti hissənin extract'ı ilə üst-üstə düşür)
+_WRITE_CHUNK_SIZE = 100
+
+
+def init_vcenter_worker(vcenter_config: Dict[str, Any]):
+    """Pool initializer - worker başlayanda vCenter'a bir dəfə bağlan
+    
+    Hər batch üçün SOAP login + Disconnect (və REST tag session login) əvəzinə
+    proses başına bir bağlantı; bütün worker'lər paralel bağlanır.
+    """
+    configure_worker_logging()
+    _worker_state.clear()
+    _worker_state['config'] = vcenter_config
+    _worker_state['db'] = DatabaseService()
+    
+    # DB yazısı ayrı thread'də - batch'in növbəti hissəsinin vCenter extract'ı ilə üst-üstə düşür
+    writer = ThreadPoolExecutor(max_workers=1)
+    Finalize(writer, writer.shutdown, exitpriority=20)
+    _worker_state['writer'] = writer
+    
+    get_worker_vcenter()
+
+
+def get_worker_vcenter():
+    """Worker'in vCenter bağlantısı - initializer'də alınmayıbsa yenidən cəhd edir
+    
+    Worker normal çıxanda Finalize ilə Disconnect olur.
+    """
+    if _worker_state.get('si'):
+        return _worker_state['vcs'], _worker_state['si']
     
-    # Her process üçün yeni service instance'ları yarat
+    vcenter_config = _worker_state['config']
     vcenter_service = VCenterService(
         host=vcenter_config['host'],
         username=vcenter_config['username'],
@@ -31,10 +63,38 @@ def process_vm_batch(args):
         default_zone=vcenter_config.get('default_zone')
     )
     
-    database_service = DatabaseService()
-    
-    # vCenter bağlantısı
     si = vcenter_service.connect_vcenter()
+    if si:
+        Finalize(None, Disconnect, args=(si,), exitpriority=10)
+        _worker_state['vcs'] = vcenter_service
+        _worker_state['si'] = si
+    
+    return vcenter_service, si
+
+
+def write_vm_batch(database_service: DatabaseService, batch_vm_data: List[Dict[str, Any]], batch_id: int):
+    """Batch hissəsini DB'yə yaz - worker'in writer thread'ində işləyir"""
+    result = database_service.bulk_upsert_vms(batch_vm_data)
+    logger.debug("Batch %s: %s yeni, %s yenilənmiş", batch_id, result['upserted'], result['modified'])
+    return result
+
+
+def _collect_write(pending, write_stats: Dict[str, int]):
+    """Writer thread'dəki yazının nəticəsini batch statistikasına əlavə et"""
+    result = pending.result()
+    for key in ('upserted', 'modified', 'errors'):
+        write_stats[key] += result[key]
+
+
+def process_vm_batch(args):
+    """VM batch'ini emal et - multiprocessing üçün (init_vcenter_worker ilə başladılmış Pool'da)"""
+    vm_ref_batch, batch_id = args
+    vcenter_config = _worker_state['config']
+    
+    # Worker prosesin bağlantısı və DB service'i (initializer'də yaradılıb)
+    vcenter_service, si = get_worker_vcenter()
+    database_service = _worker_state['db']
+    
     if not si:
         return {
             'batch_id': batch_id,
@@ -45,16 +105,24 @@ def process_vm_batch(args):
     
     try:
         batch_vm_data = []
+        pending = None
+        write_stats = {'upserted': 0, 'modified': 0, 'errors': 0}
         batch_processed = 0
         batch_errors = 0
         default_applied = 0
+        # Tapılmayan / xətalı VM'lər batch sonunda bir log ilə yazılır
+        missing = []
+        failed = []
+        default_site = vcenter_config.get('default_site')
+        default_zone = vcenter_config.get('default_zone')
+        debug = logger.isEnabledFor(logging.DEBUG)
         
         for vm_ref in vm_ref_batch:
             try:
                 # VM obyektini tap
                 vm = vcenter_service.find_vm_by_ref(si, vm_ref)
                 if not vm:
-                    logger.warning(f"VM {vm_ref['name']} tapılmadı")
+                    missing.append(vm_ref['name'])
                     batch_errors += 1
                     continue
                 
@@ -63,33 +131,63 @@ def process_vm_batch(args):
                 if vm_data:
                     batch_vm_data.append(vm_data)
                     batch_processed += 1
+                    
+                    # Hazır hissəni writer thread'ə ver, bu arada növbəti VM'lər extract olunur.
+                    # Yaddaş üçün eyni anda ən çox bir hissə yazılmağı gözləyir.
+                    if len(batch_vm_data) >= _WRITE_CHUNK_SIZE:
+                        if pending is not None:
+                            _collect_write(pending, write_stats)
+                        pending = _worker_state['writer'].submit(
+                            write_vm_batch, database_service, batch_vm_data, batch_id
+                        )
+                        batch_vm_data = []
 
-                    if vm_data.get('tags'):
-                        vm_tags = vm_data['tags'][0] if vm_data['tags'] else {}
-                        if (vcenter_config.get('default_site') and vm_tags.get('Site') == vcenter_config.get('default_site')) or \
-                           (vcenter_config.get('default_zone') and vm_tags.get('Zone') == vcenter_config.get('default_zone')):
+                    # Default site/zone yoxdursa (adi hal) yoxlama tamamilə atlanır
+                    if (default_site or default_zone) and vm_data.get('tags'):
+                        vm_tags = vm_data['tags'][0]
+                        if (default_site and vm_tags.get('Site') == default_site) or \
+                           (default_zone and vm_tags.get('Zone') == default_zone):
                             default_applied += 1
                     
                     # Tag sayını log et
-                    tag_count = len(vm_data.get('tags', []))
-                    if tag_count > 0:
-                        logger.debug(f"VM {vm_data['name']}: {tag_count} tag tapıldı")
+                    if debug:
+                        tag_count = len(vm_data.get('tags', []))
+                        if tag_count > 0:
+                            logger.debug("VM %s: %s tag tapıldı", vm_data['name'], tag_count)
                 else:
                     batch_errors += 1
                     
             except Exception as e:
-                logger.error(f"VM {vm_ref.get('name', 'Unknown')} emal xətası: {e}")
+                failed.append(f"{vm_ref.get('name', 'Unknown')}: {e}")
                 batch_errors += 1
         
-        # Database'ə bulk write
+        if missing:
+            logger.warning("Batch %s: %d VM tapılmadı: %s", batch_id, len(missing), ', '.join(missing))
+        if failed:
+            logger.error("Batch %s: %d VM emal xətası: %s", batch_id, len(failed), '; '.join(failed))
+        
+        # Qalan hissəni yaz və batch'in bütün yazılarını gözlə - nəticə bu batch'in
+        # statistikasına düşür, pool bağlananda yarımçıq yazı qalmır
+        if pending is not None:
+            _collect_write(pending, write_stats)
         if batch_vm_data:
-            result = database_service.bulk_upsert_vms(batch_vm_data)
-            logger.info(f"Batch {batch_id}: {result['upserted']} yeni, {result['modified']} yenilənmiş")
+            _collect_write(
+                _worker_state['writer'].submit(write_vm_batch, database_service, batch_vm_data, batch_id),
+                write_stats
+            )
+        
+        # DB'yə yazıla bilməyən VM'lər emal olunmuş sayılmır
+        batch_processed -= write_stats['errors']
+        batch_errors += write_stats['errors']
+        logger.info(f"Batch {batch_id}: {write_stats['upserted']} yeni, {write_stats['modified']} yenilənmiş")
         
         return {
             'batch_id': batch_id,
             'processed': batch_processed,
             'errors': batch_errors,
+            'upserted': write_stats['upserted'],
+            'modified': write_stats['modified'],
+            'write_errors': write_stats['errors'],
             'default_applied': default_applied,
             'message': f'{batch_processed} emal, {batch_errors} xəta'
         }
@@ -102,8 +200,6 @@ def process_vm_batch(args):
             'errors': len(vm_ref_batch),
             'message': f'Batch xətası: {str(e)}'
         }
-    finally:
-        Disconnect(si)
 
 
 class ProcessingService:
@@ -136,7 +232,6 @@ class ProcessingService:
             'default_zone': default_zone
         }
         
-        batch_size = batch_size or settings.batch_size
         max_processes = max_processes or settings.max_processes
         
         if default_site or default_zone:
@@ -176,39 +271,54 @@ class ProcessingService:
                     'errors': 0
                 }
             
-            # VM ref'lərini batch'lərə böl
-            vm_ref_batches = [vm_refs[i:i + batch_size] for i in range(0, len(vm_refs), batch_size)]
-            logger.info(f"{len(vm_refs)} VM ref {len(vm_ref_batches)} batch'ə bölündü")
+            # Batch ölçüsü/prosess sayı VM sayına görə (batch_size verilməyibsə)
+            batch_size, max_processes = plan_batches(len(vm_refs), batch_size, max_processes)
+            logger.info(f"batch_size={batch_size}, max_processes={max_processes}")
+            
+            # VM ref'lərini batch'lərə böl - generator, Pool batch'ları lazım olduqca götürür
+            batch_count = (len(vm_refs) + batch_size - 1) // batch_size
+            logger.info(f"{len(vm_refs)} VM ref {batch_count} batch'ə bölündü")
             
             Disconnect(si)
             
             # Batch argümanlarını hazırla
-            batch_args = [
-                (batch, vcenter_config, i+1)
-                for i, batch in enumerate(vm_ref_batches)
-            ]
+            batch_args = (
+                (batch, i + 1)
+                for i, batch in enumerate(iter_chunks(vm_refs, batch_size))
+            )
             
             # Multiprocessing ilə emal
             start_time = time.time()
             logger.info(f"Multiprocessing başladı ({max_processes} prosess)")
             
-            with Pool(processes=max_processes) as pool:
-                results = pool.map(process_vm_batch, batch_args)
+            # Batch nəticələri hazır olduqca gəlir - dərhal log et və say
+            results = []
+            total_processed = 0
+            total_errors = 0
+            total_defaults = 0
+            logger.info("=" * 50)
+            logger.info("EMAL TƏFSİLATI:")
+            pool_context = get_pool_context()
+            with pool_context.Pool(processes=max_processes, initializer=init_vcenter_worker,
+                                   initargs=(vcenter_config,)) as pool:
+                for result in pool.imap_unordered(process_vm_batch, batch_args, chunksize=1):
+                    results.append(result)
+                    total_processed += result['processed']
+                    total_errors += result['errors']
+                    total_defaults += result.get('default_applied', 0)
+                    logger.info(f"Batch {result['batch_id']}: {result['message']}")
+                    log_processing_progress(total_processed + total_errors, len(vm_refs), "VM progress")
+                
+                # Worker'lər normal çıxsın ki, vCenter bağlantıları Disconnect olsun
+                pool.close()
+                pool.join()
             
             end_time = time.time()
             
-            # Nəticələri hesabla
-            total_processed = sum(r['processed'] for r in results)
-            total_errors = sum(r['errors'] for r in results)
-            total_defaults = sum(r.get('default_applied', 0) for r in results)
+            # Response üçün batch'ları ilkin sıraya qaytar
+            results.sort(key=lambda r: r['batch_id'])
             processing_time = end_time - start_time
             
-            # Nəticələri log et
-            logger.info("=" * 50)
-            logger.info("EMAL TƏFSİLATI:")
-            for result in results:
-                logger.info(f"Batch {result['batch_id']}: {result['message']}")
-            
             logger.info("=" * 50)
             logger.info("ÜMUMİ NƏTİCƏ:")
             logger.info(f"Toplam VM sayı: {len(vm_refs)}")
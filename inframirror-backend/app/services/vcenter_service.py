@@ -14,6 +14,7 @@ from pyVim.connect import SmartConnect, Disconnect
 from pyVmomi import vim, vmodl
 
 from app.core.config import settings
+from app.utils.utils import create_jira_asset_tags, format_mb_to_gb, parse_tag_mapping
 
 # SSL xəbərdarlıqlarını söndür
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -111,33 +112,58 @@ class VCenterService:
             logger.error(f"REST API sessiya xətası: {e}")
             return None
     
-    def get_all_vm_refs(self, si) -> List[Dict[str, Any]]:
-        """Bütün VM'lərin referanslarını əldə et"""
+    def iter_all_vm_refs(self, si, page_size: int = 1000):
+        """VM referanslarını səhifə-səhifə ver (generator)
+        
+        vm.name / vm.config.uuid hər VM üçün ayrı SOAP sorğusu (config isə bütün
+        konfiqurasiya) idi; PropertyCollector yalnız lazım olan iki property'ni
+        page_size VM'lik səhifələrlə gətirir.
+        """
+        content = si.RetrieveContent()
+        containerView = content.viewManager.CreateContainerView(
+            content.rootFolder, [vim.VirtualMachine], True
+        )
+        
         try:
-            content = si.RetrieveContent()
-            container = content.rootFolder
-            viewType = [vim.VirtualMachine]
-            recursive = True
-            
-            containerView = content.viewManager.CreateContainerView(
-                container, viewType, recursive
+            traversal_spec = vmodl.query.PropertyCollector.TraversalSpec(
+                name='traverseView', path='view', skip=False, type=vim.view.ContainerView
             )
-            
-            vms = containerView.view
-            vm_refs = []
-            
-            for vm in vms:
-                try:
-                    vm_refs.append({
-                        'vmid': vm._moId,
-                        'name': vm.name,
-                        'uuid': vm.config.uuid if vm.config else None
-                    })
-                except Exception as e:
-                    logger.warning(f"VM ref əldə etmə xətası: {e}")
-                    continue
-            
+            object_spec = vmodl.query.PropertyCollector.ObjectSpec(
+                obj=containerView, skip=True, selectSet=[traversal_spec]
+            )
+            property_spec = vmodl.query.PropertyCollector.PropertySpec(
+                type=vim.VirtualMachine, pathSet=['name', 'config.uuid'], all=False
+            )
+            filter_spec = vmodl.query.PropertyCollector.FilterSpec(
+                objectSet=[object_spec], propSet=[property_spec]
+            )
+            options = vmodl.query.PropertyCollector.RetrieveOptions(maxObjects=page_size)
+            
+            collector = content.propertyCollector
+            result = collector.RetrievePropertiesEx([filter_spec], options)
+            while result:
+                for obj in result.objects:
+                    # config olmayan (inaccessible) VM'lərdə config.uuid missingSet'də olur
+                    props = {prop.name: prop.val for prop in obj.propSet}
+                    if props.get('name') is None:
+                        logger.warning(f"VM ref əldə etmə xətası: {obj.obj._moId} adı yoxdur")
+                        continue
+                    yield {
+                        'vmid': obj.obj._moId,
+                        'name': props['name'],
+                        'uuid': props.get('config.uuid')
+                    }
+                
+                if not result.token:
+                    break
+                result = collector.ContinueRetrievePropertiesEx(result.token)
+        finally:
             containerView.Destroy()
+    
+    def get_all_vm_refs(self, si) -> List[Dict[str, Any]]:
+        """Bütün VM'lərin referanslarını əldə et"""
+        try:
+            vm_refs = list(self.iter_all_vm_refs(si))
             logger.info(f"Toplam {len(vm_refs)} VM ref əldə edildi")
             return vm_refs
             
@@ -311,8 +337,9 @@ class VCenterService:
         """Custom Attributes"""
         try:
             custom_attrs = []
-            if vm.config and hasattr(vm.config, 'extraConfig'):
-                for config in vm.config.extraConfig:
+            vm_config = vm.config
+            if vm_config and hasattr(vm_config, 'extraConfig'):
+                for config in vm_config.extraConfig:
                     if config.key.startswith('guestinfo.tag.') or config.key.startswith('tag.'):
                         custom_attrs.append({
                             'tag_id': f'custom_{config.key}',
@@ -324,8 +351,9 @@ class VCenterService:
                             'category_cardinality': 'MULTIPLE'
                         })
             
-            if vm.availableField:
-                for field in vm.availableField:
+            available_fields = vm.availableField
+            if available_fields:
+                for field in available_fields:
                     if 'tag' in field.name.lower():
                         custom_attrs.append({
                             'tag_id': f'field_{field.key}',
@@ -344,17 +372,22 @@ class VCenterService:
     def extract_vm_data(self, si, vm) -> Optional[Dict[str, Any]]:
         """VM məlumatlarını çıxar - VMID dəstəyi ilə"""
         try:
+            # Hər vm.<property> oxunuşu ayrı SOAP sorğusudur (vm.config bütün konfiqurasiyanı
+            # gətirir) - config/runtime bir dəfə oxunur
+            vm_config = vm.config
+            vm_runtime = vm.runtime
+            
             # VM əsas məlumatları
             vm_data = {
                 'name': vm.name,
                 'mobid': vm._moId,
-                'uuid': vm.config.uuid if vm.config else None,
-                'instance_uuid': vm.config.instanceUuid if vm.config else None,
-                'power_state': str(vm.runtime.powerState) if vm.runtime else None,
-                'guest_os': vm.config.guestFullName if vm.config else None,
-                'vm_version': vm.config.version if vm.config else None,
-                'annotation': vm.config.annotation if vm.config else None,
-                'created_date': vm.config.createDate if vm.config else None,
+                'uuid': vm_config.uuid if vm_config else None,
+                'instance_uuid': vm_config.instanceUuid if vm_config else None,
+                'power_state': str(vm_runtime.powerState) if vm_runtime else None,
+                'guest_os': vm_config.guestFullName if vm_config else None,
+                'vm_version': vm_config.version if vm_config else None,
+                'annotation': vm_config.annotation if vm_config else None,
+                'created_date': vm_config.createDate if vm_config else None,
                 'last_updated': datetime.utcnow(),
             }
             
@@ -362,33 +395,35 @@ class VCenterService:
             vmid = None
             
             # Method 1: VM Config-dən VMID custom attribute olaraq
-            if vm.config and hasattr(vm.config, 'extraConfig'):
-                for config in vm.config.extraConfig:
+            if vm_config and hasattr(vm_config, 'extraConfig'):
+                for config in vm_config.extraConfig:
                     if config.key.lower() in ['vmid', 'vm_id', 'guestinfo.vmid']:
                         vmid = config.value
-                        logger.debug(f"VMID found in extraConfig: {vmid}")
+                        logger.debug("VMID found in extraConfig: %s", vmid)
                         break
             
             # Method 2: Custom Values-dan
-            if not vmid and vm.customValue:
-                for custom_val in vm.customValue:
+            custom_values = vm.customValue if not vmid else None
+            if custom_values:
+                available_fields = vm.availableField
+                for custom_val in custom_values:
                     # Custom field key'ini yoxla
                     if hasattr(custom_val, 'key') and custom_val.key:
                         # Available field'ləri yoxla
-                        if vm.availableField:
-                            for field in vm.availableField:
+                        if available_fields:
+                            for field in available_fields:
                                 if (field.key == custom_val.key and 
                                     field.name and 
                                     'vmid' in field.name.lower()):
                                     vmid = custom_val.value
-                                    logger.debug(f"VMID found in custom values: {vmid}")
+                                    logger.debug("VMID found in custom values: %s", vmid)
                                     break
                         if vmid:
                             break
             
             # Method 3: Annotation-dan VMID axtarışı
-            if not vmid and vm.config and vm.config.annotation:
-                annotation = vm.config.annotation.lower()
+            if not vmid and vm_config and vm_config.annotation:
+                annotation = vm_config.annotation.lower()
                 # Annotation mətnindən VMID axtarışı
                 import re
                 vmid_patterns = [
@@ -401,13 +436,13 @@ class VCenterService:
                     match = re.search(pattern, annotation)
                     if match:
                         vmid = match.group(1)
-                        logger.debug(f"VMID found in annotation: {vmid}")
+                        logger.debug("VMID found in annotation: %s", vmid)
                         break
             
             # Method 4: MobID-ni VMID kimi istifadə et (fallback)
             if not vmid:
                 vmid = vm._moId
-                logger.debug(f"Using MobID as VMID fallback: {vmid}")
+                logger.debug("Using MobID as VMID fallback: %s", vmid)
             
             # VMID-ni vm_data-ya əlavə et
             vm_data['vmid'] = vmid
@@ -418,13 +453,7 @@ class VCenterService:
             raw_tags = self.get_vm_tags_multiple_methods(si, vm, vm._moId)
             
             # Tag'ları emal et
-            processed_tags = {}
-            for tag in raw_tags:
-                category_name = tag.get('category_name')
-                tag_name = tag.get('tag_name')
-
-                if category_name and tag_name:
-                    processed_tags[category_name] = tag_name
+            processed_tags = parse_tag_mapping(raw_tags)
 
             # Default dəyərləri tətbiq et
             if self.default_site and 'Site' not in processed_tags:
@@ -436,19 +465,7 @@ class VCenterService:
                 vm_data['tags'] = [processed_tags]
 
                 # Jira Asset tag mapping
-                jira_tags = {}
-                tag_mapping = {
-                    'Systems': 'System',
-                    'Zone': 'Zone',
-                    'ComponentName': 'Component',
-                    'VmEnvironment': 'Environment',
-                    'Tribes': 'Tribe',
-                    'Squads': 'Squad'
-                }
-
-                for original_key, jira_key in tag_mapping.items():
-                    if original_key in processed_tags:
-                        jira_tags[jira_key] = processed_tags[original_key]
+                jira_tags = create_jira_asset_tags(processed_tags)
 
                 vm_data['tags_jira_asset'] = [jira_tags] if jira_tags else []
             else:
@@ -456,17 +473,18 @@ class VCenterService:
                 vm_data['tags_jira_asset'] = []
             
             # Hardware məlumatları
-            if vm.config and vm.config.hardware:
+            hardware = vm_config.hardware if vm_config else None
+            if hardware:
                 vm_data.update({
-                    'cpu_count': vm.config.hardware.numCPU,
-                    'cpu_cores_per_socket': vm.config.hardware.numCoresPerSocket,
-                    'memory_mb': vm.config.hardware.memoryMB,
-                    'memory_gb': round(vm.config.hardware.memoryMB / 1024, 2)
+                    'cpu_count': hardware.numCPU,
+                    'cpu_cores_per_socket': hardware.numCoresPerSocket,
+                    'memory_mb': hardware.memoryMB,
+                    'memory_gb': format_mb_to_gb(hardware.memoryMB)
                 })
             
             # ... (disk, network, guest məlumatları və s.)
             
-            logger.info(f"VM {vm.name} extracted with VMID: {vmid}")
+            logger.info(f"VM {vm_data['name']} extracted with VMID: {vmid}")
             return vm_data
             
         except Exception as e:
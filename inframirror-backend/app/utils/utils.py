@@ -2,17 +2,58 @@
 Utility functions
 """
 
+import re
 import ssl
+import json
 import logging
+import multiprocessing
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import urllib3
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from app.core.config import settings
+
+# Log faylı və formatı - main.py və multiprocessing worker'ləri paylaşır
+_LOG_FILE = 'vmware_collector.log'
+_LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
 # SSL warnings'lari söndür
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 logger = logging.getLogger(__name__)
 
+# VM adında qalan simvollar: hərf/rəqəm (\w = isalnum + '_') və '-', '.', ' '
+_VM_NAME_DISALLOWED = re.compile(r'[^\w\-. ]')
+
+# vCenter tag category -> Jira Asset tag key
+_JIRA_TAG_MAP = (
+    ('Systems', 'System'),
+    ('Zone', 'Zone'),
+    ('ComponentName', 'Component'),
+    ('VmEnvironment', 'Environment'),
+    ('Tribes', 'Tribe'),
+    ('Squads', 'Squad'),
+)
+
+# vCenter konfiqində boş ola bilməyən sahələr
+_VCENTER_REQUIRED_FIELDS = ('host', 'username', 'password')
+
+# Log/response-da mask edilən konfiq sahələri
+_SENSITIVE_FIELDS = ('password', 'token', 'api_key', 'secret')
+
+# Avtomatik seçilən batch ölçüsünün yuxarı həddi
+_MAX_AUTO_BATCH_SIZE = 1000
+
+# forkserver prosesində bir dəfə import olunan worker modulları (pyVmomi, pymongo və s.)
+_WORKER_PRELOAD = ['app.services.processing_service', 'app.services.jira_processing_service']
+
 
 def create_ssl_context() -> ssl.SSLContext:
     """SSL context yarat"""
@@ -37,75 +78,118 @@ def format_mb_to_gb(mb_value: int) -> float:
     return round(mb_value / 1024, 2)
 
 
+def get_pool_context():
+    """Worker Pool'ları üçün multiprocessing context (settings.multiprocessing_start_method)
+    
+    forkserver'də worker'lər thread'li API prosesindən (uvicorn, Mongo monitor
+    thread'ləri) yox, tək thread'li server prosesindən fork olunur - lock'lar
+    miras qalmır və worker yalnız preload olunmuş modulları paylaşır.
+    """
+    ctx = multiprocessing.get_context(settings.multiprocessing_start_method)
+    if settings.multiprocessing_start_method == 'forkserver':
+        ctx.set_forkserver_preload(_WORKER_PRELOAD)
+    return ctx
+
+
+def plan_batches(total: int, batch_size: Optional[int], max_processes: int) -> Tuple[int, int]:
+    """VM sayına görə (batch_size, max_processes) seç
+    
+    batch_size verilməyibsə hər worker'ə ~4 batch düşür (settings.batch_size ilə
+    _MAX_AUTO_BATCH_SIZE arası) - kiçik fleet'də əvvəlki kimi, böyükdə daha az
+    IPC/upsert. Batch sayından artıq worker açılmır (hər biri login olur).
+    """
+    if not batch_size:
+        per_batch = -(-total // (max_processes * 4))
+        batch_size = min(_MAX_AUTO_BATCH_SIZE, max(settings.batch_size, per_batch))
+    batch_count = -(-total // batch_size)
+    return batch_size, max(1, min(max_processes, batch_count))
+
+
+def configure_logging():
+    """Root logger: vmware_collector.log faylı + console (API və worker'lər eyni konfiqurasiya)"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=_LOG_FORMAT,
+        handlers=[
+            logging.FileHandler(_LOG_FILE),
+            logging.StreamHandler()
+        ]
+    )
+
+
+def configure_worker_logging():
+    """spawn/forkserver worker'lərində root logger konfiqurasiyasız gəlir - API ilə eyni handler'lar"""
+    configure_logging()
+
+
 def sanitize_vm_name(name: str) -> str:
     """VM adını təmizlə"""
     if not name:
         return "Unknown"
     
     # Xüsusi simvolları çıxar
-    sanitized = ''.join(c for c in name if c.isalnum() or c in ['-', '_', '.', ' '])
-    return sanitized.strip()
+    return _VM_NAME_DISALLOWED.sub('', name).strip()
 
 
 def parse_tag_mapping(tags: List[Dict[str, Any]]) -> Dict[str, str]:
-    """Tag'ları key-value mapping'ə çevir"""
-    mapping = {}
-    
-    for tag in tags:
-        category_name = tag.get('category_name')
-        tag_name = tag.get('tag_name')
-        
-        if category_name and tag_name:
-            mapping[category_name] = tag_name
-    
-    return mapping
+    """Tag'ları key-value mapping'ə çevir (kateqoriya və ya ad boşdursa atlanır)"""
+    return {
+        tag['category_name']: tag['tag_name']
+        for tag in tags
+        if tag.get('category_name') and tag.get('tag_name')
+    }
 
 
 def create_jira_asset_tags(processed_tags: Dict[str, str]) -> Dict[str, str]:
     """Jira Asset üçün tag mapping yarat"""
-    jira_tags = {}
-    
-    tag_mapping = {
-        'Systems': 'System',
-        'Zone': 'Zone',
-        'ComponentName': 'Component',
-        'VmEnvironment': 'Environment',
-        'Tribes': 'Tribe',
-        'Squads': 'Squad'
+    return {
+        jira_key: processed_tags[original_key]
+        for original_key, jira_key in _JIRA_TAG_MAP
+        if original_key in processed_tags
     }
-    
-    for original_key, jira_key in tag_mapping.items():
-        if original_key in processed_tags:
-            jira_tags[jira_key] = processed_tags[original_key]
-    
-    return jira_tags
 
 
 def calculate_processing_stats(results: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """Processing statistikalarını hesabla"""
-    total_processed = sum(r.get('processed', 0) for r in results)
-    total_errors = sum(r.get('errors', 0) for r in results)
+    """Processing statistikalarını hesabla (results üzərindən bir keçid)"""
+    total_processed = 0
+    total_errors = 0
+    for r in results:
+        total_processed += r.get('processed', 0)
+        total_errors += r.get('errors', 0)
     
+    total = total_processed + total_errors
     return {
         'total_batches': len(results),
         'total_processed': total_processed,
         'total_errors': total_errors,
-        'success_rate': (total_processed / (total_processed + total_errors) * 100) if (total_processed + total_errors) > 0 else 0
+        'success_rate': (total_processed / total * 100) if total > 0 else 0
     }
 
 
 def validate_vcenter_config(config: Dict[str, Any]) -> bool:
     """vCenter konfiqurasiyanı yoxla"""
-    required_fields = ['host', 'username', 'password']
-    
-    for field in required_fields:
-        if not config.get(field):
-            logger.error(f"vCenter konfiq xətası: {field} boşdur")
-            return False
+    missing = [field for field in _VCENTER_REQUIRED_FIELDS if not config.get(field)]
+    if missing:
+        logger.error("vCenter konfiq xətası: %s boşdur", ', '.join(missing))
+        return False
     
     return True
 
 
+def dumps_json(data: Any, sort_keys: bool = False) -> bytes:
+    """Data'nı JSON bytes'a çevir - orjson varsa onunla (daha sürətli)"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SORT_KEYS if sort_keys else None)
+    return json.dumps(data, sort_keys=sort_keys).encode('utf-8')
+
+
+def loads_json(data: Any) -> Any:
+    """JSON bytes/str'i parse et - orjson varsa onunla (daha sürətli)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 def format_datetime_for_json(dt: datetime) -> str:
     """Datetime'i JSON üçün format et"""
     if dt:
@@ -114,25 +198,32 @@ def format_datetime_for_json(dt: datetime) -> str:
 
 
 def safe_get_attribute(obj: Any, attr_path: str, default: Any = None) -> Any:
-    """Təhlükəsiz şəkildə nested attribute əldə et"""
+    """Təhlükəsiz şəkildə nested attribute əldə et
+    
+    attrgetter path'i C-də gəzir; hasattr + getattr hər seqmenti iki dəfə oxuyurdu
+    (pyVmomi obyektlərində iki property sorğusu).
+    """
     try:
-        attrs = attr_path.split('.')
-        result = obj
-        
-        for attr in attrs:
-            if hasattr(result, attr):
-                result = getattr(result, attr)
-            else:
-                return default
-        
-        return result
+        return _attr_getter(attr_path)(obj)
     except Exception:
         return default
 
 
+@lru_cache(maxsize=1024)
+def _attr_getter(attr_path: str) -> attrgetter:
+    """attr_path üçün keşlənmiş attrgetter"""
+    return attrgetter(attr_path)
+
+
 def chunk_list(lst: List[Any], chunk_size: int) -> List[List[Any]]:
     """List'i chunk'lara böl"""
-    return [lst[i:i + chunk_size] for i in range(0, len(lst), chunk_size)]
+    return list(iter_chunks(lst, chunk_size))
+
+
+def iter_chunks(lst: List[Any], chunk_size: int) -> Iterator[List[Any]]:
+    """List'i chunk'lara böl - generator, hər chunk lazım olanda kəsilir"""
+    for i in range(0, len(lst), chunk_size):
+        yield lst[i:i + chunk_size]
 
 
 def log_processing_progress(current: int, total: int, prefix: str = "Progress"):
@@ -169,9 +260,7 @@ def mask_sensitive_config(config: Dict[str, Any]) -> Dict[str, Any]:
     """Sensitive məlumatları mask et"""
     masked_config = config.copy()
     
-    sensitive_fields = ['password', 'token', 'api_key', 'secret']
-    
-    for field in sensitive_fields:
+    for field in _SENSITIVE_FIELDS:
         if field in masked_config:
             value = masked_config[field]
             if isinstance(value, str) and len(value) > 4:
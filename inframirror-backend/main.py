@@ -5,25 +5,27 @@ VMware vCenter məlumatlarını toplamaq və MongoDB'yə yazmaq üçün FastAPI
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 from contextlib import asynccontextmanager
 import logging
 
 from app.api.v1 import endpoints
 from app.core.config import settings
 from app.core.database import init_database
+from app.utils.utils import configure_logging
 
 # Logging konfiqurasiyası
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('vmware_collector.log'),
-        logging.StreamHandler()
-    ]
-)
+configure_logging()
 
 logger = logging.getLogger(__name__)
 
+# Response'lar orjson ilə serialize olunsun (datetime'ı da özü çevirir) - yoxdursa standart json
+try:
+    import orjson  # noqa: F401
+    default_response_class = ORJSONResponse
+except ImportError:
+    default_response_class = JSONResponse
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifecycle manager"""
@@ -38,7 +40,8 @@ app = FastAPI(
     title="VMware Collector API",
     description="VMware vCenter məlumatlarını toplamaq və MongoDB'yə yazmaq üçün API",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=default_response_class
 )
 
 # CORS middleware
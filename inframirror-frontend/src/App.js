@@ -162,7 +162,6 @@ const VMwareCollectorApp = () => {
           default_site: config.vcenter.default_site || null,
           default_zone: config.vcenter.default_zone || null
         },
-        batch_size: 50,
         max_processes: 8
       };
 
@@ -209,7 +208,6 @@ const VMwareCollectorApp = () => {
         method: 'POST',
         body: JSON.stringify({
           jira_config: apiConfig.jira_config,
-          batch_size: 50,
           max_processes: 8
         })
       }, logs, setLogs);
@@ -245,7 +243,6 @@ const VMwareCollectorApp = () => {
           default_site: config.vcenter.default_site || null,
           default_zone: config.vcenter.default_zone || null
         },
-        batch_size: 50,
         max_processes: 8
       };
 